@@ -11,184 +11,220 @@ A comprehensive Java interpreter with classes, methods, and advanced features
 """
 
 import re
+import sys
 import math
-from enum import Enum, auto
+import functools
+from enum import IntEnum, auto
 from dataclasses import dataclass, field
 from typing import List, Any, Dict, Optional, Union
 import json
+from json.encoder import encode_basestring_ascii as _encode_json_string
+import operator
+from array import array
 
 # ===========================
 # AST (Abstract Syntax Tree)
 # ===========================
 
-@dataclass
+# Operator spellings stored in BinOp.op, UnaryOp.op and CompoundAssign.op. The parser builds
+# nodes from these objects and the evaluator compares against the same objects, so every
+# operator test is decided by the identity check inside str.__eq__.
+_OP_OR = sys.intern('||')
+_OP_AND = sys.intern('&&')
+_OP_EQ = sys.intern('==')
+_OP_NE = sys.intern('!=')
+_OP_LT = sys.intern('<')
+_OP_LE = sys.intern('<=')
+_OP_GT = sys.intern('>')
+_OP_GE = sys.intern('>=')
+_OP_ADD = sys.intern('+')
+_OP_SUB = sys.intern('-')
+_OP_MUL = sys.intern('*')
+_OP_DIV = sys.intern('/')
+_OP_MOD = sys.intern('%')
+_OP_NOT = sys.intern('!')
+_OP_NEG = _OP_SUB
+_OP_PRE_INC = sys.intern('++pre')
+_OP_PRE_DEC = sys.intern('--pre')
+_OP_POST_INC = sys.intern('++post')
+_OP_POST_DEC = sys.intern('--post')
+
+@dataclass(eq=False, slots=True)
 class Expr:
     
     pass
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class IntLit(Expr):
     value: int
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class FloatLit(Expr):
     value: float
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class StringLit(Expr):
     value: str
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class BoolLit(Expr):
     value: bool
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class CharLit(Expr):
     value: str
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class NullLit(Expr):
     pass
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Variable(Expr):
     name: str
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class BinOp(Expr):
     op: str
     left: Expr
     right: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class UnaryOp(Expr):
     op: str
     operand: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class TernaryOp(Expr):
     condition: Expr
     true_expr: Expr
     false_expr: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ArrayAccess(Expr):
     array: Expr
     index: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class FieldAccess(Expr):
     obj: Expr
     field: str
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class MethodCall(Expr):
     obj: Optional[Expr]
     method: str
     args: List[Expr]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class NewObject(Expr):
     class_name: str
     args: List[Expr]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class NewArray(Expr):
     element_type: str
     sizes: List[Expr]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ArrayInit(Expr):
     elements: List[Expr]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Cast(Expr):
     target_type: str
     expr: Expr
 
 # Statements
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Stmt:
     
     pass
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class VarDecl(Stmt):
     var_type: str
     name: str
     value: Optional[Expr]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Assign(Stmt):
     target: str
     value: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
+class CompoundAssign(Stmt):
+    target: str
+    op: str  # '+' or '-'
+    value: Expr
+
+@dataclass(eq=False, slots=True)
 class ArrayAssign(Stmt):
     array: str
     index: Expr
     value: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class FieldAssign(Stmt):
     obj: Expr
     field: str
     value: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class If(Stmt):
     condition: Expr
     then_block: List[Stmt]
     else_block: List[Stmt]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class While(Stmt):
     condition: Expr
     body: List[Stmt]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class DoWhile(Stmt):
     body: List[Stmt]
     condition: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class For(Stmt):
     init: Optional[Stmt]
     condition: Optional[Expr]
     update: Optional[Stmt]
     body: List[Stmt]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ForEach(Stmt):
     var_type: str
     var: str
     iterable: Expr
     body: List[Stmt]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Switch(Stmt):
     expr: Expr
     cases: List[tuple]  # [(value, stmts), ...]
     default: Optional[List[Stmt]]
+    # label value -> index of its first case, when every label is a literal
+    case_index: Optional[Dict[Any, int]] = None
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Break(Stmt):
     pass
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Continue(Stmt):
     pass
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Return(Stmt):
     expr: Optional[Expr]
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ExprStmt(Stmt):
     expr: Expr
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Try(Stmt):
     try_block: List[Stmt]
     catch_blocks: List[tuple]  # [(exception_type, var, stmts), ...]
@@ -196,35 +232,58 @@ class Try(Stmt):
 
 # Top-level declarations
 
-@dataclass
-class MethodDecl:
+class LazyBody:
+    """Mixin for declarations whose braced body is parsed from its token span on first access"""
+    __slots__ = ()
+
+    @property
+    def body(self) -> List[Stmt]:
+        if self.parsed_body is None:
+            self.parsed_body = self.parser.parse_span(self.body_span)
+        return self.parsed_body
+
+@dataclass(eq=False, slots=True)
+class MethodDecl(LazyBody):
     modifiers: List[str]
     return_type: str
     name: str
     params: List[tuple]  # [(type, name), ...]
-    body: List[Stmt]
+    parsed_body: Optional[List[Stmt]]
+    body_span: Optional[tuple] = None  # (start, end) token indices of the unparsed body
+    parser: Any = field(default=None, repr=False)
+    code: Any = field(default=None, repr=False)  # compiled on first call
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class FieldDecl:
     modifiers: List[str]
     field_type: str
     name: str
     value: Optional[Expr]
 
-@dataclass
-class Constructor:
+@dataclass(eq=False, slots=True)
+class Constructor(LazyBody):
     modifiers: List[str]
     name: str
     params: List[tuple]
-    body: List[Stmt]
+    parsed_body: Optional[List[Stmt]]
+    body_span: Optional[tuple] = None
+    parser: Any = field(default=None, repr=False)
+    code: Any = field(default=None, repr=False)  # compiled on first call
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ClassDecl:
     modifiers: List[str]
     name: str
     fields: List[FieldDecl]
     constructors: List[Constructor]
     methods: List[MethodDecl]
+    # Built when the evaluator registers the class: the first method for each
+    # (name, parameter count) and the first constructor for each parameter count
+    method_index: Optional[Dict[tuple, MethodDecl]] = field(default=None, repr=False)
+    constructor_index: Optional[Dict[int, Constructor]] = field(default=None, repr=False)
+    field_index: Optional[Dict[str, int]] = field(default=None, repr=False)  # name -> value slot
+    # Evaluates every field declaration's initial value, in order, into a list
+    init_code: Any = field(default=None, repr=False)
 
 # ===========================
 # EXCEPTIONS
@@ -244,7 +303,7 @@ class ReturnException(Exception):
 # LEXER (Tokenizer)
 # ===========================
 
-class TokenType(Enum):
+class TokenType(IntEnum):
     # Literals
     INT = auto()
     FLOAT = auto()
@@ -329,428 +388,541 @@ class TokenType(Enum):
     
     EOF = auto()
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     type: TokenType
     value: Any
     line: int
     col: int
 
+@dataclass(slots=True)
+class TokenStream:
+    """Lexer output stored column-wise: one entry per token in each column"""
+    types: array  # TokenType values
+    values: List[Any]
+    lines: array
+    cols: array
+    
+    def __len__(self):
+        return len(self.types)
+    
+    def __getitem__(self, index: int) -> Token:
+        return Token(TokenType(self.types[index]), self.values[index], self.lines[index], self.cols[index])
+
+# One alternative per token class; every byte of the source is covered by some
+# alternative, so finditer walks the whole input with no gaps
+_TOKEN_RE = re.compile(rb'''
+    (?P<SKIP>(?:[ \t\n\r]+|//[^\n]*|/\*.*?\*/)+)
+  | (?P<OPEN_COMMENT>/\*)
+  | (?P<NUMBER>[0-9]+(?P<FRACTION>\.[0-9]+)?(?P<EXPONENT>[eE][+-]?[0-9]+)?(?P<SUFFIX>[fFdD])?)
+  | (?P<ID>(?:\w|[\xc0-\xff][\x80-\xbf]*)+)
+  | (?P<STRING>"[^"\\]*(?:\\.[^"\\]*)*")
+  | (?P<CHAR>'(?P<CHAR_ESCAPE>\\)?(?P<CHAR_BODY>[\x00-\x7f]|[\xc0-\xff][\x80-\xbf]*)?(?P<CHAR_END>')?)
+  | (?P<OP>\+\+|--|==|!=|<=|>=|&&|\|\||\+=|-=|[-+*/%=<>!(){}\[\];,.:?])
+  | (?P<ERROR>[\xc0-\xff][\x80-\xbf]*|.)
+''', re.VERBOSE | re.DOTALL)
+_ESCAPE_RE = re.compile(rb'\\(.)', re.DOTALL)
+
+# Escape sequences recognised in string and char literals; anything else stands for itself
+_STRING_ESCAPES = {b'n': b'\n', b't': b'\t', b'r': b'\r', b'\\': b'\\', b'"': b'"', b'\'': b'\''}
+_CHAR_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', '\'': '\''}
+
+def _unescape(m) -> bytes:
+    return _STRING_ESCAPES.get(m.group(1), m.group(1))
+
 class Lexer:
     def __init__(self, code: str):
-        self.code = code
+        self.code = code.encode('utf-8')
+        self.ascii = code.isascii()
         self.pos = 0
         self.line = 1
         self.col = 1
+        # Raw identifier bytes -> (type, interned value) already produced for them
+        self.identifiers: Dict[bytes, tuple] = {}
         
     def error(self, msg: str):
         raise SyntaxError(f"Line {self.line}, Col {self.col}: {msg}")
     
-    def peek(self, offset=0):
-        pos = self.pos + offset
-        if pos < len(self.code):
-            return self.code[pos]
-        return None
-    
-    def advance(self):
-        if self.pos < len(self.code):
-            if self.code[self.pos] == '\n':
-                self.line += 1
-                self.col = 1
-            else:
-                self.col += 1
-            self.pos += 1
-    
-    def skip_whitespace(self):
-        while self.peek() and self.peek() in ' \t\n\r':
-            self.advance()
+    def char_at(self, pos: int) -> str:
+        return self.code[pos:pos + 4].decode('utf-8', 'ignore')[:1]
     
-    def skip_comment(self):
-        if self.peek() == '/' and self.peek(1) == '/':
-            while self.peek() and self.peek() != '\n':
-                self.advance()
-            return True
-        
-        if self.peek() == '/' and self.peek(1) == '*':
-            self.advance()
-            self.advance()
-            while self.peek():
-                if self.peek() == '*' and self.peek(1) == '/':
-                    self.advance()
-                    self.advance()
-                    return True
-                self.advance()
-            self.error("Unterminated comment")
+    def advance_to(self, end: int):
+        newlines = self.code.count(b'\n', self.pos, end)
+        if newlines:
+            self.line += newlines
+            start = self.code.rfind(b'\n', self.pos, end) + 1
+            self.col = 1
+        else:
+            start = self.pos
         
-        return False
-    
-    def read_number(self):
-        start_col = self.col
-        num_str = ''
-        has_dot = False
-        
-        while self.peek() and (self.peek().isdigit() or self.peek() == '.'):
-            if self.peek() == '.':
-                if has_dot or (self.peek(1) and not self.peek(1).isdigit()):
-                    break
-                has_dot = True
-            num_str += self.peek()
-            self.advance()
-        
-        if self.peek() and self.peek() in 'fFdD':
-            self.advance()
-            has_dot = True
-        
-        if has_dot:
-            return Token(TokenType.FLOAT, float(num_str), self.line, start_col)
+        if self.ascii:
+            self.col += end - start
         else:
-            return Token(TokenType.INT, int(num_str), self.line, start_col)
+            self.col += len(self.code[start:end].decode('utf-8', 'ignore'))
+        self.pos = end
     
-    def read_string(self):
-        start_col = self.col
-        self.advance()
-        string = ''
-        
-        while self.peek() and self.peek() != '"':
-            if self.peek() == '\\':
-                self.advance()
-                escape_chars = {'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', '"': '"', '\'': '\''}
-                string += escape_chars.get(self.peek(), self.peek() or '')
-            else:
-                string += self.peek()
-            self.advance()
-        
-        if self.peek() != '"':
-            self.error("Unterminated string")
-        self.advance()
-        
-        return Token(TokenType.STRING, string, self.line, start_col)
+    def identifier(self, raw: bytes) -> tuple:
+        token = self.identifiers.get(raw)
+        if token is None:
+            ident = sys.intern(raw.decode('utf-8'))
+            if not ident[0].isalpha() and ident[0] != '_':
+                self.error(f"Unexpected character: {ident[0]}")
+            if not raw.isascii():
+                # The pattern takes any multi-byte character; a name stops at the first one
+                # that is not a letter or digit, which is reported where it stands
+                for i, ch in enumerate(ident):
+                    if not ch.isalnum() and ch != '_':
+                        self.col += i
+                        self.error(f"Unexpected character: {ch}")
+            n = len(ident)
+            bucket = _KEYWORDS_BY_LENGTH[n] if n < len(_KEYWORDS_BY_LENGTH) else None
+            token_type = bucket.get(ident) if bucket else None
+            token = (TokenType.ID, ident) if token_type is None else (token_type, None)
+            self.identifiers[raw] = token
+        return token
     
-    def read_char(self):
-        start_col = self.col
-        self.advance()
-        
-        if self.peek() == '\\':
-            self.advance()
-            escape_chars = {'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', '\'': '\''}
-            char = escape_chars.get(self.peek(), self.peek() or '')
-            self.advance()
-        else:
-            char = self.peek() or ''
-            self.advance()
-        
-        if self.peek() != '\'':
-            self.error("Unterminated char literal")
-        self.advance()
-        
-        return Token(TokenType.CHAR, char, self.line, start_col)
+    def string(self, text: bytes) -> str:
+        body = text[1:-1]
+        if b'\\' in body:
+            body = _ESCAPE_RE.sub(_unescape, body)
+        return sys.intern(body.decode('utf-8'))
     
-    def read_identifier(self):
-        start_col = self.col
-        ident = ''
-        
-        while self.peek() and (self.peek().isalnum() or self.peek() == '_'):
-            ident += self.peek()
-            self.advance()
-        
-        keywords = {
-            'class': TokenType.CLASS, 'public': TokenType.PUBLIC, 'private': TokenType.PRIVATE,
-            'protected': TokenType.PROTECTED, 'static': TokenType.STATIC, 'final': TokenType.FINAL,
-            'void': TokenType.VOID, 'int': TokenType.INT_TYPE, 'float': TokenType.FLOAT_TYPE,
-            'double': TokenType.DOUBLE_TYPE, 'boolean': TokenType.BOOLEAN_TYPE,
-            'char': TokenType.CHAR_TYPE, 'String': TokenType.STRING_TYPE,
-            'if': TokenType.IF, 'else': TokenType.ELSE, 'while': TokenType.WHILE,
-            'do': TokenType.DO, 'for': TokenType.FOR, 'switch': TokenType.SWITCH,
-            'case': TokenType.CASE, 'default': TokenType.DEFAULT,
-            'break': TokenType.BREAK, 'continue': TokenType.CONTINUE,
-            'return': TokenType.RETURN, 'new': TokenType.NEW,
-            'this': TokenType.THIS, 'super': TokenType.SUPER,
-            'try': TokenType.TRY, 'catch': TokenType.CATCH, 'finally': TokenType.FINALLY,
-            'throw': TokenType.THROW, 'throws': TokenType.THROWS,
-            'extends': TokenType.EXTENDS, 'implements': TokenType.IMPLEMENTS,
-            'true': TokenType.TRUE, 'false': TokenType.FALSE, 'null': TokenType.NULL,
-        }
-        
-        token_type = keywords.get(ident, TokenType.ID)
-        value = ident if token_type == TokenType.ID else None
-        
-        return Token(token_type, value, self.line, start_col)
+    def char(self, m) -> str:
+        raw = m.group('CHAR_BODY')
+        char = raw.decode('utf-8') if raw else ''
+        if m.group('CHAR_ESCAPE'):
+            char = _CHAR_ESCAPES.get(char, char)
+        if not m.group('CHAR_END'):
+            self.advance_to(m.end())
+            self.error("Unterminated char literal")
+        return sys.intern(char)
     
-    def tokenize(self) -> List[Token]:
-        tokens = []
-        
-        while self.pos < len(self.code):
-            self.skip_whitespace()
-            
-            while self.skip_comment():
-                self.skip_whitespace()
-            
-            if self.pos >= len(self.code):
-                break
-            
-            ch = self.peek()
-            start_col = self.col
-            
-            if ch.isdigit():
-                tokens.append(self.read_number())
-                continue
-            
-            if ch == '"':
-                tokens.append(self.read_string())
-                continue
+    def tokenize(self) -> TokenStream:
+        types = array('B')
+        values = []
+        lines = array('i')
+        cols = array('i')
+        code = self.code
+        ascii_only = self.ascii
+        identifiers = self.identifiers
+        operators = _OPERATOR_TOKENS
+        append_type = types.append
+        append_value = values.append
+        append_line = lines.append
+        append_col = cols.append
+        
+        line = 1
+        line_start = 0  # byte offset of the first character on the current line
+        for m in _TOKEN_RE.finditer(code):
+            kind = m.lastgroup
+            start = m.start()
             
-            if ch == '\'':
-                tokens.append(self.read_char())
+            if kind == 'SKIP':
+                newlines = code.count(b'\n', start, m.end())
+                if newlines:
+                    line += newlines
+                    line_start = code.rfind(b'\n', start, m.end()) + 1
                 continue
             
-            if ch.isalpha() or ch == '_':
-                tokens.append(self.read_identifier())
-                continue
-            
-            # Two-character operators
-            two_char = {
-                '++': TokenType.PLUSPLUS, '--': TokenType.MINUSMINUS,
-                '==': TokenType.EQ, '!=': TokenType.NE,
-                '<=': TokenType.LE, '>=': TokenType.GE,
-                '&&': TokenType.AND, '||': TokenType.OR,
-                '+=': TokenType.PLUSASSIGN, '-=': TokenType.MINUSASSIGN,
-            }
-            
-            two_ch = ch + (self.peek(1) or '')
-            if two_ch in two_char:
-                tokens.append(Token(two_char[two_ch], None, self.line, start_col))
-                self.advance()
-                self.advance()
-                continue
-            
-            # Single-character
-            single_char = {
-                '+': TokenType.PLUS, '-': TokenType.MINUS, '*': TokenType.STAR,
-                '/': TokenType.SLASH, '%': TokenType.PERCENT, '=': TokenType.ASSIGN,
-                '<': TokenType.LT, '>': TokenType.GT, '!': TokenType.NOT,
-                '(': TokenType.LPAREN, ')': TokenType.RPAREN,
-                '{': TokenType.LBRACE, '}': TokenType.RBRACE,
-                '[': TokenType.LBRACKET, ']': TokenType.RBRACKET,
-                ';': TokenType.SEMICOLON, ',': TokenType.COMMA,
-                '.': TokenType.DOT, ':': TokenType.COLON, '?': TokenType.QUESTION,
-            }
+            if ascii_only:
+                col = start - line_start + 1
+            else:
+                col = len(code[line_start:start].decode('utf-8')) + 1
+            self.pos, self.line, self.col = start, line, col
+            append_line(line)
+            append_col(col)
             
-            if ch in single_char:
-                tokens.append(Token(single_char[ch], None, self.line, start_col))
-                self.advance()
-                continue
+            if kind == 'OP':
+                append_type(operators[m.group()])
+                append_value(None)
+            elif kind == 'ID':
+                token = identifiers.get(m.group())
+                if token is None:
+                    token = self.identifier(m.group())
+                append_type(token[0])
+                append_value(token[1])
+            elif kind == 'NUMBER':
+                text = m.group()
+                fraction, exponent, suffix = m.group('FRACTION', 'EXPONENT', 'SUFFIX')
+                if fraction or exponent or suffix:
+                    append_type(TokenType.FLOAT)
+                    append_value(float(text[:-1] if suffix else text))
+                else:
+                    append_type(TokenType.INT)
+                    append_value(int(text))
+            elif kind == 'STRING':
+                text = m.group()
+                append_type(TokenType.STRING)
+                append_value(self.string(text))
+            elif kind == 'CHAR':
+                text = m.group()
+                append_type(TokenType.CHAR)
+                append_value(self.char(m))
+            elif kind == 'OPEN_COMMENT':
+                self.advance_to(len(code))
+                self.error("Unterminated comment")
+            elif m.group() == b'"':
+                self.advance_to(len(code))
+                self.error("Unterminated string")
+            else:
+                self.error(f"Unexpected character: {self.char_at(start)}")
             
-            self.error(f"Unexpected character: {ch}")
-        
-        tokens.append(Token(TokenType.EOF, None, self.line, self.col))
-        return tokens
+            # Only string and char literals can span lines
+            if (kind == 'STRING' or kind == 'CHAR') and b'\n' in text:
+                line += text.count(b'\n')
+                line_start = code.rfind(b'\n', start, m.end()) + 1
+        
+        append_type(TokenType.EOF)
+        append_value(None)
+        append_line(line)
+        if ascii_only:
+            append_col(len(code) - line_start + 1)
+        else:
+            append_col(len(code[line_start:].decode('utf-8')) + 1)
+        return TokenStream(types, values, lines, cols)
+
+_KEYWORDS = {
+    'class': TokenType.CLASS, 'public': TokenType.PUBLIC, 'private': TokenType.PRIVATE,
+    'protected': TokenType.PROTECTED, 'static': TokenType.STATIC, 'final': TokenType.FINAL,
+    'void': TokenType.VOID, 'int': TokenType.INT_TYPE, 'float': TokenType.FLOAT_TYPE,
+    'double': TokenType.DOUBLE_TYPE, 'boolean': TokenType.BOOLEAN_TYPE,
+    'char': TokenType.CHAR_TYPE, 'String': TokenType.STRING_TYPE,
+    'if': TokenType.IF, 'else': TokenType.ELSE, 'while': TokenType.WHILE,
+    'do': TokenType.DO, 'for': TokenType.FOR, 'switch': TokenType.SWITCH,
+    'case': TokenType.CASE, 'default': TokenType.DEFAULT,
+    'break': TokenType.BREAK, 'continue': TokenType.CONTINUE,
+    'return': TokenType.RETURN, 'new': TokenType.NEW,
+    'this': TokenType.THIS, 'super': TokenType.SUPER,
+    'try': TokenType.TRY, 'catch': TokenType.CATCH, 'finally': TokenType.FINALLY,
+    'throw': TokenType.THROW, 'throws': TokenType.THROWS,
+    'extends': TokenType.EXTENDS, 'implements': TokenType.IMPLEMENTS,
+    'true': TokenType.TRUE, 'false': TokenType.FALSE, 'null': TokenType.NULL,
+}
+
+# Keywords bucketed by length; identifiers of any other length skip hashing entirely
+_KEYWORDS_BY_LENGTH = [None] * (max(map(len, _KEYWORDS)) + 1)
+for _word, _token_type in _KEYWORDS.items():
+    if _KEYWORDS_BY_LENGTH[len(_word)] is None:
+        _KEYWORDS_BY_LENGTH[len(_word)] = {}
+    _KEYWORDS_BY_LENGTH[len(_word)][_word] = _token_type
+del _word, _token_type
+
+_OPERATOR_TOKENS = {
+    b'++': TokenType.PLUSPLUS, b'--': TokenType.MINUSMINUS,
+    b'==': TokenType.EQ, b'!=': TokenType.NE,
+    b'<=': TokenType.LE, b'>=': TokenType.GE,
+    b'&&': TokenType.AND, b'||': TokenType.OR,
+    b'+=': TokenType.PLUSASSIGN, b'-=': TokenType.MINUSASSIGN,
+    b'+': TokenType.PLUS, b'-': TokenType.MINUS, b'*': TokenType.STAR,
+    b'/': TokenType.SLASH, b'%': TokenType.PERCENT, b'=': TokenType.ASSIGN,
+    b'<': TokenType.LT, b'>': TokenType.GT, b'!': TokenType.NOT,
+    b'(': TokenType.LPAREN, b')': TokenType.RPAREN,
+    b'{': TokenType.LBRACE, b'}': TokenType.RBRACE,
+    b'[': TokenType.LBRACKET, b']': TokenType.RBRACKET,
+    b';': TokenType.SEMICOLON, b',': TokenType.COMMA,
+    b'.': TokenType.DOT, b':': TokenType.COLON, b'?': TokenType.QUESTION,
+}
 
 # ===========================
 # PARSER
 # ===========================
 
+# Every token type as a plain int module global (_TT_PLUS, _TT_ID, ...). The parser compares
+# against these because loading TokenType.X goes through the enum class on every use.
+globals().update({f'_TT_{token_type.name}': token_type.value for token_type in TokenType})
+
+# Token classes tested by the parser, built once instead of on every check
+_PRIMITIVE_TYPE_TOKENS = frozenset({
+    _TT_INT_TYPE, _TT_FLOAT_TYPE, _TT_DOUBLE_TYPE,
+    _TT_BOOLEAN_TYPE, _TT_CHAR_TYPE,
+})
+_TYPE_TOKENS = _PRIMITIVE_TYPE_TOKENS | {_TT_STRING_TYPE, _TT_VOID, _TT_ID}
+# Modifier token -> the name stored in MethodDecl/FieldDecl/ClassDecl.modifiers
+_MODIFIER_NAMES = {
+    _TT_PUBLIC: 'public', _TT_PRIVATE: 'private', _TT_PROTECTED: 'protected',
+    _TT_STATIC: 'static', _TT_FINAL: 'final',
+}
+_CLASS_START_TOKENS = frozenset({_TT_PUBLIC, _TT_PRIVATE, _TT_CLASS})
+_STMT_START_TOKENS = frozenset({_TT_IF, _TT_WHILE, _TT_FOR, _TT_ID})
+_DECL_LOOKAHEAD_TOKENS = frozenset({_TT_ID, _TT_LBRACKET})
+_LABEL_TOKENS = frozenset({_TT_CASE, _TT_DEFAULT})
+_CASE_END_TOKENS = frozenset({_TT_CASE, _TT_DEFAULT, _TT_RBRACE})
+_DEFAULT_END_TOKENS = frozenset({_TT_CASE, _TT_RBRACE})
+_BLOCK_END_TOKENS = frozenset({_TT_RBRACE, _TT_EOF})
+_ARGS_END_TOKENS = frozenset({_TT_RPAREN, _TT_EOF})
+_PARAMS_END_TOKENS = frozenset({_TT_RPAREN})
+_ELEMENTS_END_TOKENS = frozenset({_TT_RBRACE})
+
+# Byte patterns over the array('B') types column
+_LBRACE_BYTE = bytes([_TT_LBRACE])
+_BRACE_RE = re.compile(b'[' + re.escape(bytes([_TT_LBRACE, _TT_RBRACE])) + b']')
+
+_TYPE_STR_MAP = {
+    _TT_INT_TYPE: 'int', _TT_FLOAT_TYPE: 'float',
+    _TT_DOUBLE_TYPE: 'double', _TT_BOOLEAN_TYPE: 'boolean',
+    _TT_CHAR_TYPE: 'char', _TT_STRING_TYPE: 'String',
+    _TT_VOID: 'void',
+}
+
+# Binary operator token -> (precedence, operator string); higher binds tighter
+_RELATIONAL_PREC = 4
+_UNARY_PREC = 7
+_BINARY_OPS = {
+    _TT_OR: (1, _OP_OR),
+    _TT_AND: (2, _OP_AND),
+    _TT_EQ: (3, _OP_EQ), _TT_NE: (3, _OP_NE),
+    _TT_LT: (_RELATIONAL_PREC, _OP_LT), _TT_LE: (_RELATIONAL_PREC, _OP_LE),
+    _TT_GT: (_RELATIONAL_PREC, _OP_GT), _TT_GE: (_RELATIONAL_PREC, _OP_GE),
+    _TT_PLUS: (5, _OP_ADD), _TT_MINUS: (5, _OP_SUB),
+    _TT_STAR: (6, _OP_MUL), _TT_SLASH: (6, _OP_DIV), _TT_PERCENT: (6, _OP_MOD),
+}
+
+# Operators folded at parse time when both operands are literals, with the same
+# meaning the evaluator gives them
+_NUMERIC_FOLDS = {
+    _OP_ADD: operator.add, _OP_SUB: operator.sub, _OP_MUL: operator.mul,
+    _OP_DIV: operator.truediv, _OP_MOD: operator.mod,
+    _OP_EQ: operator.eq, _OP_NE: operator.ne,
+    _OP_LT: operator.lt, _OP_LE: operator.le,
+    _OP_GT: operator.gt, _OP_GE: operator.ge,
+}
+_BOOLEAN_FOLDS = {
+    _OP_AND: lambda l, r: l and r, _OP_OR: lambda l, r: l or r,
+    _OP_EQ: operator.eq, _OP_NE: operator.ne,
+}
+_STRING_FOLDS = {
+    _OP_ADD: lambda l, r: str(l) + str(r),
+    _OP_EQ: operator.eq, _OP_NE: operator.ne,
+}
+_TEXT_LITERALS = (StringLit, CharLit)
+_VALUE_LITERALS = (IntLit, FloatLit, BoolLit, StringLit, CharLit)
+
+def _literal(value) -> Expr:
+    if isinstance(value, str):
+        return StringLit(sys.intern(value))
+    if isinstance(value, bool):
+        return _TRUE_LIT if value else _FALSE_LIT
+    if isinstance(value, int):
+        node = _SMALL_INT_LITS.get(value)
+        return node if node is not None else IntLit(value)
+    return FloatLit(value)
+
+def _fold_binary(op: str, left: Expr, right: Expr) -> Expr:
+    """BinOp(op, left, right), or the literal it evaluates to when both sides are int/float,
+    both are boolean, or one is a string/char literal (concatenation and equality).
+    Anything that would fail at run time (division by zero, overflow) is left for the
+    evaluator to report."""
+    left_type, right_type = type(left), type(right)
+    if left_type in (IntLit, FloatLit) and right_type in (IntLit, FloatLit):
+        fold = _NUMERIC_FOLDS.get(op)
+        if fold is not None and not (op in (_OP_DIV, _OP_MOD) and right.value == 0):
+            try:
+                return _literal(fold(left.value, right.value))
+            except ArithmeticError:
+                pass
+    elif left_type is BoolLit and right_type is BoolLit:
+        fold = _BOOLEAN_FOLDS.get(op)
+        if fold is not None:
+            return _literal(fold(left.value, right.value))
+    elif ((left_type in _TEXT_LITERALS and right_type in _VALUE_LITERALS)
+          or (right_type in _TEXT_LITERALS and left_type in _VALUE_LITERALS)):
+        # + concatenates as soon as either side is a string; == and != compare plainly
+        fold = _STRING_FOLDS.get(op)
+        if fold is not None and (op == _OP_ADD or (left_type in _TEXT_LITERALS
+                                                   and right_type in _TEXT_LITERALS)):
+            return _literal(fold(left.value, right.value))
+    return BinOp(op, left, right)
+
+def _fold_cast(target_type: str, expr: Expr) -> Expr:
+    """Cast(target_type, expr), or the converted literal when expr is one"""
+    if type(expr) in _VALUE_LITERALS:
+        convert = _cast_function(target_type)
+        if convert is None:
+            return expr
+        try:
+            return _literal(convert(expr.value))
+        except (ValueError, ArithmeticError):  # (int) "x", (int) of an infinite double
+            pass
+    return Cast(target_type, expr)
+
 class Parser:
-    def __init__(self, tokens: List[Token]):
+    def __init__(self, tokens: TokenStream, fold_constants: bool = False):
         self.tokens = tokens
+        self.types = tokens.types
+        self.values = tokens.values
         self.pos = 0
+        # Replace operators on literal operands with their result. Off for --ast, which
+        # shows the program as written.
+        self.fold_constants = fold_constants
+        # (element type, dimensions) -> array type string, shared by every declaration of it
+        self.array_types: Dict[tuple, str] = {}
         
     def error(self, msg: str):
         token = self.current()
         raise SyntaxError(f"Line {token.line}, Col {token.col}: {msg}")
     
+    # The stream always ends with an EOF token and pos never moves past it, so the
+    # current token and the one after any non-EOF token can be indexed directly
     def current(self) -> Token:
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else self.tokens[-1]
-    
-    def peek(self, offset=1) -> Token:
-        pos = self.pos + offset
-        return self.tokens[pos] if pos < len(self.tokens) else self.tokens[-1]
+        return self.tokens[self.pos]
     
     def advance(self):
-        if self.pos < len(self.tokens) - 1:
+        if self.types[self.pos] != _TT_EOF:
             self.pos += 1
     
-    def expect(self, token_type: TokenType):
-        if self.current().type != token_type:
-            self.error(f"Expected {token_type.name}, got {self.current().type.name}")
-        self.advance()
+    def expect(self, token_type: int):
+        if self.types[self.pos] != token_type:
+            self._error_expected(token_type)
+        # The matched token is not EOF, so there is always a next token to move to
+        self.pos += 1
+    
+    def _error_expected(self, token_type: int):
+        """Error path of expect(). Hot checks (statement ends, closing brackets, loop and
+        if headers) are written out inline and only call this on a mismatch."""
+        self.error(f"Expected {TokenType(token_type).name}, got {TokenType(self.types[self.pos]).name}")
     
     def is_type(self) -> bool:
-        return self.current().type in (
-            TokenType.INT_TYPE, TokenType.FLOAT_TYPE, TokenType.DOUBLE_TYPE,
-            TokenType.BOOLEAN_TYPE, TokenType.CHAR_TYPE, TokenType.STRING_TYPE,
-            TokenType.VOID, TokenType.ID
-        )
+        return self.types[self.pos] in _TYPE_TOKENS
     
     def parse_type(self) -> str:
-        type_map = {
-            TokenType.INT_TYPE: 'int', TokenType.FLOAT_TYPE: 'float',
-            TokenType.DOUBLE_TYPE: 'double', TokenType.BOOLEAN_TYPE: 'boolean',
-            TokenType.CHAR_TYPE: 'char', TokenType.STRING_TYPE: 'String',
-            TokenType.VOID: 'void',
-        }
-        
-        if self.current().type == TokenType.ID:
-            type_str = self.current().value
-            self.advance()
-        elif self.current().type in type_map:
-            type_str = type_map[self.current().type]
-            self.advance()
+        types = self.types
+        token_type = types[self.pos]
+        if token_type == _TT_ID:
+            type_str = self.values[self.pos]
+        elif token_type in _TYPE_STR_MAP:
+            type_str = _TYPE_STR_MAP[token_type]
         else:
             self.error("Expected type")
+        self.pos += 1
         
-        while self.current().type == TokenType.LBRACKET:
-            self.advance()
-            self.expect(TokenType.RBRACKET)
-            type_str += '[]'
+        if types[self.pos] != _TT_LBRACKET:
+            return type_str
         
-        return type_str
+        dimensions = 0
+        while types[self.pos] == _TT_LBRACKET:
+            self.pos += 1
+            self.expect(_TT_RBRACKET)
+            dimensions += 1
+        
+        key = (type_str, dimensions)
+        array_type = self.array_types.get(key)
+        if array_type is None:
+            array_type = self.array_types[key] = type_str + '[]' * dimensions
+        return array_type
     
     # Expression parsing
     
     def parse_expr(self) -> Expr:
-        return self.parse_ternary()
-    
-    def parse_ternary(self) -> Expr:
-        expr = self.parse_or()
+        expr = self.parse_binary(0)
         
-        if self.current().type == TokenType.QUESTION:
-            self.advance()
+        if self.types[self.pos] == _TT_QUESTION:
+            self.pos += 1
             true_expr = self.parse_expr()
-            self.expect(TokenType.COLON)
+            self.expect(_TT_COLON)
             false_expr = self.parse_expr()
+            if self.fold_constants and type(expr) is BoolLit:
+                return true_expr if expr.value else false_expr
             return TernaryOp(expr, true_expr, false_expr)
         
         return expr
     
-    def parse_or(self) -> Expr:
-        left = self.parse_and()
-        while self.current().type == TokenType.OR:
-            self.advance()
-            right = self.parse_and()
-            left = BinOp('||', left, right)
-        return left
-    
-    def parse_and(self) -> Expr:
-        left = self.parse_equality()
-        while self.current().type == TokenType.AND:
-            self.advance()
-            right = self.parse_equality()
-            left = BinOp('&&', left, right)
-        return left
-    
-    def parse_equality(self) -> Expr:
-        left = self.parse_relational()
-        
-        while self.current().type in (TokenType.EQ, TokenType.NE):
-            op = '==' if self.current().type == TokenType.EQ else '!='
-            self.advance()
-            right = self.parse_relational()
-            left = BinOp(op, left, right)
-        
-        return left
-    
-    def parse_relational(self) -> Expr:
-        left = self.parse_additive()
-        
-        ops = {TokenType.LT: '<', TokenType.LE: '<=', TokenType.GT: '>', TokenType.GE: '>='}
-        
-        if self.current().type in ops:
-            op = ops[self.current().type]
-            self.advance()
-            right = self.parse_additive()
-            return BinOp(op, left, right)
-        
-        return left
-    
-    def parse_additive(self) -> Expr:
-        left = self.parse_multiplicative()
-        
-        while self.current().type in (TokenType.PLUS, TokenType.MINUS):
-            op = '+' if self.current().type == TokenType.PLUS else '-'
-            self.advance()
-            right = self.parse_multiplicative()
-            left = BinOp(op, left, right)
-        
-        return left
-    
-    def parse_multiplicative(self) -> Expr:
+    def parse_binary(self, min_prec: int) -> Expr:
+        """Precedence climbing over _BINARY_OPS. Every level is left-associative except
+        the relational one, which does not chain: in `a < b < c` the second < is left
+        unconsumed, exactly as if each level had its own method."""
         left = self.parse_unary()
+        types = self.types
+        last_prec = _UNARY_PREC  # precedence of the last operator applied in this loop
         
-        ops = {TokenType.STAR: '*', TokenType.SLASH: '/', TokenType.PERCENT: '%'}
-        
-        while self.current().type in ops:
-            op = ops[self.current().type]
-            self.advance()
-            right = self.parse_unary()
-            left = BinOp(op, left, right)
-        
-        return left
+        while True:
+            entry = _BINARY_OPS.get(types[self.pos])
+            if entry is None:
+                return left
+            prec, op = entry
+            if prec < min_prec or (prec == _RELATIONAL_PREC and last_prec <= _RELATIONAL_PREC):
+                return left
+            self.pos += 1
+            right = self.parse_binary(prec + 1)
+            left = _fold_binary(op, left, right) if self.fold_constants else BinOp(op, left, right)
+            last_prec = prec
     
     def parse_unary(self) -> Expr:
-        if self.current().type == TokenType.NOT:
-            self.advance()
-            return UnaryOp('!', self.parse_unary())
+        token_type = self.types[self.pos]
         
-        if self.current().type == TokenType.MINUS:
-            self.advance()
-            return UnaryOp('-', self.parse_unary())
+        if token_type == _TT_NOT:
+            self.pos += 1
+            operand = self.parse_unary()
+            if self.fold_constants and type(operand) is BoolLit:
+                return _literal(not operand.value)
+            return UnaryOp(_OP_NOT, operand)
+        
+        if token_type == _TT_MINUS:
+            self.pos += 1
+            operand = self.parse_unary()
+            if self.fold_constants and type(operand) in (IntLit, FloatLit):
+                return _literal(-operand.value)
+            return UnaryOp(_OP_NEG, operand)
         
-        if self.current().type == TokenType.PLUS:
-            self.advance()
+        if token_type == _TT_PLUS:
+            self.pos += 1
             return self.parse_unary()
         
-        if self.current().type == TokenType.PLUSPLUS:
-            self.advance()
-            return UnaryOp('++pre', self.parse_unary())
+        if token_type == _TT_PLUSPLUS:
+            self.pos += 1
+            return UnaryOp(_OP_PRE_INC, self.parse_unary())
         
-        if self.current().type == TokenType.MINUSMINUS:
-            self.advance()
-            return UnaryOp('--pre', self.parse_unary())
+        if token_type == _TT_MINUSMINUS:
+            self.pos += 1
+            return UnaryOp(_OP_PRE_DEC, self.parse_unary())
         
         # Type cast
-        if self.current().type == TokenType.LPAREN and self.peek().type in (
-            TokenType.INT_TYPE, TokenType.FLOAT_TYPE, TokenType.DOUBLE_TYPE,
-            TokenType.BOOLEAN_TYPE, TokenType.CHAR_TYPE):
-            self.advance()
+        if token_type == _TT_LPAREN and self.types[self.pos + 1] in _PRIMITIVE_TYPE_TOKENS:
+            self.pos += 1
             target_type = self.parse_type()
-            self.expect(TokenType.RPAREN)
+            self.expect(_TT_RPAREN)
             expr = self.parse_unary()
-            return Cast(target_type, expr)
+            return _fold_cast(target_type, expr) if self.fold_constants else Cast(target_type, expr)
         
         return self.parse_postfix()
     
     def parse_postfix(self) -> Expr:
         expr = self.parse_primary()
+        types = self.types
         
         while True:
-            if self.current().type == TokenType.LBRACKET:
-                self.advance()
+            token_type = types[self.pos]
+            if token_type == _TT_LBRACKET:
+                self.pos += 1
                 index = self.parse_expr()
-                self.expect(TokenType.RBRACKET)
+                if types[self.pos] != _TT_RBRACKET:
+                    self._error_expected(_TT_RBRACKET)
+                self.pos += 1
                 expr = ArrayAccess(expr, index)
             
-            elif self.current().type == TokenType.DOT:
-                self.advance()
-                if self.current().type != TokenType.ID:
+            elif token_type == _TT_DOT:
+                self.pos += 1
+                if types[self.pos] != _TT_ID:
                     self.error("Expected field or method name")
-                name = self.current().value
-                self.advance()
+                name = self.values[self.pos]
+                self.pos += 1
                 
-                if self.current().type == TokenType.LPAREN:
-                    self.advance()
+                if types[self.pos] == _TT_LPAREN:
+                    self.pos += 1
                     args = self.parse_args()
-                    self.expect(TokenType.RPAREN)
+                    if types[self.pos] != _TT_RPAREN:
+                        self._error_expected(_TT_RPAREN)
+                    self.pos += 1
                     expr = MethodCall(expr, name, args)
                 else:
                     expr = FieldAccess(expr, name)
             
-            elif self.current().type == TokenType.PLUSPLUS:
-                self.advance()
-                expr = UnaryOp('++post', expr)
+            elif token_type == _TT_PLUSPLUS:
+                self.pos += 1
+                expr = UnaryOp(_OP_POST_INC, expr)
             
-            elif self.current().type == TokenType.MINUSMINUS:
-                self.advance()
-                expr = UnaryOp('--post', expr)
+            elif token_type == _TT_MINUSMINUS:
+                self.pos += 1
+                expr = UnaryOp(_OP_POST_DEC, expr)
             
             else:
                 break
@@ -758,314 +930,275 @@ class Parser:
         return expr
     
     def parse_primary(self) -> Expr:
-        token = self.current()
-        
-        if token.type == TokenType.INT:
-            self.advance()
-            return IntLit(token.value)
-        
-        if token.type == TokenType.FLOAT:
-            self.advance()
-            return FloatLit(token.value)
-        
-        if token.type == TokenType.STRING:
-            self.advance()
-            return StringLit(token.value)
-        
-        if token.type == TokenType.CHAR:
-            self.advance()
-            return CharLit(token.value)
-        
-        if token.type == TokenType.TRUE:
-            self.advance()
-            return BoolLit(True)
-        
-        if token.type == TokenType.FALSE:
-            self.advance()
-            return BoolLit(False)
-        
-        if token.type == TokenType.NULL:
-            self.advance()
-            return NullLit()
-        
-        if token.type == TokenType.THIS:
-            self.advance()
-            return Variable('this')
-        
-        # New object or array
-        if token.type == TokenType.NEW:
-            self.advance()
-            
-            # Get the type/class name
-            if self.current().type == TokenType.ID:
-                type_name = self.current().value
-                self.advance()
-            else:
-                # Primitive type for array
-                type_name = self.parse_type()
-            
-            if self.current().type == TokenType.LBRACKET:
-                # Array creation
-                sizes = []
-                while self.current().type == TokenType.LBRACKET:
-                    self.advance()
-                    if self.current().type != TokenType.RBRACKET:
-                        sizes.append(self.parse_expr())
-                    self.expect(TokenType.RBRACKET)
-                return NewArray(type_name, sizes)
-            elif self.current().type == TokenType.LPAREN:
-                # Object creation
-                self.advance()
-                args = self.parse_args()
-                self.expect(TokenType.RPAREN)
-                return NewObject(type_name, args)
-            else:
-                self.error("Expected ( or [ after new")
-        
-        # Array initialization
-        if token.type == TokenType.LBRACE:
-            self.advance()
-            elements = []
-            
-            if self.current().type != TokenType.RBRACE:
-                elements.append(self.parse_expr())
-                while self.current().type == TokenType.COMMA:
-                    self.advance()
-                    if self.current().type == TokenType.RBRACE:
-                        break
-                    elements.append(self.parse_expr())
-            
-            self.expect(TokenType.RBRACE)
-            return ArrayInit(elements)
+        handler = _PRIMARY_PARSERS.get(self.types[self.pos])
+        if handler is None:
+            self.error(f"Unexpected token: {TokenType(self.types[self.pos]).name}")
+        return handler(self)
+    
+    def parse_literal(self) -> Expr:
+        node = _LITERAL_NODES[self.types[self.pos]](self.values[self.pos])
+        self.pos += 1
+        return node
+    
+    def parse_int_literal(self) -> IntLit:
+        value = self.values[self.pos]
+        self.pos += 1
+        node = _SMALL_INT_LITS.get(value)
+        return node if node is not None else IntLit(value)
+    
+    def parse_bool_literal(self) -> BoolLit:
+        node = _TRUE_LIT if self.types[self.pos] == _TT_TRUE else _FALSE_LIT
+        self.pos += 1
+        return node
+    
+    def parse_null(self) -> NullLit:
+        self.pos += 1
+        return _NULL_LIT
+    
+    def parse_this(self) -> Variable:
+        self.pos += 1
+        return Variable('this')
+    
+    def parse_new(self) -> Expr:
+        """New object or array"""
+        self.pos += 1
         
-        # Identifier
-        if token.type == TokenType.ID:
-            name = token.value
-            self.advance()
-            
-            if self.current().type == TokenType.LPAREN:
-                self.advance()
-                args = self.parse_args()
-                self.expect(TokenType.RPAREN)
-                return MethodCall(None, name, args)
-            
-            return Variable(name)
+        # Get the type/class name
+        if self.types[self.pos] == _TT_ID:
+            type_name = self.values[self.pos]
+            self.pos += 1
+        else:
+            # Primitive type for array
+            type_name = self.parse_type()
+        
+        if self.types[self.pos] == _TT_LBRACKET:
+            # Array creation
+            sizes = []
+            while self.types[self.pos] == _TT_LBRACKET:
+                self.pos += 1
+                if self.types[self.pos] != _TT_RBRACKET:
+                    sizes.append(self.parse_expr())
+                self.expect(_TT_RBRACKET)
+            return NewArray(type_name, sizes)
+        elif self.types[self.pos] == _TT_LPAREN:
+            # Object creation
+            self.pos += 1
+            args = self.parse_args()
+            self.expect(_TT_RPAREN)
+            return NewObject(type_name, args)
+        else:
+            self.error("Expected ( or [ after new")
+    
+    def parse_array_init(self) -> ArrayInit:
+        self.pos += 1
+        elements = self.parse_comma_list(self.parse_expr, _ELEMENTS_END_TOKENS, trailing_comma=True)
+        self.expect(_TT_RBRACE)
+        return ArrayInit(elements)
+    
+    def parse_name(self) -> Expr:
+        """Variable reference or unqualified method call"""
+        name = self.values[self.pos]
+        self.pos += 1
         
-        # Parenthesized expression
-        if token.type == TokenType.LPAREN:
-            self.advance()
-            expr = self.parse_expr()
-            self.expect(TokenType.RPAREN)
-            return expr
+        if self.types[self.pos] == _TT_LPAREN:
+            self.pos += 1
+            args = self.parse_args()
+            if self.types[self.pos] != _TT_RPAREN:
+                self._error_expected(_TT_RPAREN)
+            self.pos += 1
+            return MethodCall(None, name, args)
         
-        self.error(f"Unexpected token: {token.type.name}")
+        return Variable(name)
+    
+    def parse_paren(self) -> Expr:
+        self.pos += 1
+        expr = self.parse_expr()
+        if self.types[self.pos] != _TT_RPAREN:
+            self._error_expected(_TT_RPAREN)
+        self.pos += 1
+        return expr
     
     def parse_args(self) -> List[Expr]:
-        args = []
-        
-        if self.current().type not in (TokenType.RPAREN, TokenType.EOF):
-            args.append(self.parse_expr())
-            while self.current().type == TokenType.COMMA:
-                self.advance()
-                args.append(self.parse_expr())
+        return self.parse_comma_list(self.parse_expr, _ARGS_END_TOKENS)
+    
+    def parse_comma_list(self, parse_element, end_tokens: frozenset, trailing_comma: bool = False) -> list:
+        """Comma-separated elements up to, not including, a token in end_tokens. With
+        trailing_comma a comma may directly precede the end token, as in {1, 2,}."""
+        types = self.types
+        if types[self.pos] in end_tokens:
+            return []
         
-        return args
+        elements = [parse_element()]
+        while types[self.pos] == _TT_COMMA:
+            self.pos += 1
+            if trailing_comma and types[self.pos] in end_tokens:
+                break
+            elements.append(parse_element())
+        return elements
     
     # Statement parsing
     
     def parse_stmt(self) -> Optional[Stmt]:
-        token = self.current()
+        token_type = self.types[self.pos]
         
-        # Check for control flow keywords first
-        if token.type == TokenType.IF:
-            return self.parse_if()
+        # Statements introduced by a keyword
+        handler = _STMT_PARSERS.get(token_type)
+        if handler is not None:
+            return handler(self)
         
-        if token.type == TokenType.WHILE:
-            return self.parse_while()
-        
-        if token.type == TokenType.DO:
-            return self.parse_do_while()
-        
-        if token.type == TokenType.FOR:
-            return self.parse_for()
-        
-        if token.type == TokenType.SWITCH:
-            return self.parse_switch()
-        
-        if token.type == TokenType.BREAK:
-            self.advance()
-            self.expect(TokenType.SEMICOLON)
-            return Break()
-        
-        if token.type == TokenType.CONTINUE:
-            self.advance()
-            self.expect(TokenType.SEMICOLON)
-            return Continue()
-        
-        if token.type == TokenType.RETURN:
-            self.advance()
-            expr = None
-            if self.current().type != TokenType.SEMICOLON:
-                expr = self.parse_expr()
-            self.expect(TokenType.SEMICOLON)
-            return Return(expr)
-        
-        if token.type == TokenType.TRY:
-            return self.parse_try()
-        
-        if token.type == TokenType.LBRACE:
+        if token_type == _TT_LBRACE:
             return None
         
-        # This keyword for field assignment
-        if token.type == TokenType.THIS:
-            self.advance()
-            self.expect(TokenType.DOT)
-            
-            if self.current().type != TokenType.ID:
-                self.error("Expected field name")
-            field_name = self.current().value
-            self.advance()
-            
-            self.expect(TokenType.ASSIGN)
-            value = self.parse_expr()
-            self.expect(TokenType.SEMICOLON)
-            return FieldAssign(Variable('this'), field_name, value)
-        
-        # Variable declaration - must have type followed by ID
-        if self.is_type():
-            # Look ahead to see if this is really a declaration
-            # Type followed by ID followed by = or ; means declaration
-            # Type followed by ID followed by ( means method call (not declaration in statement context)
+        types = self.types
+        
+        # Variable declaration - a type followed by a name. A bare ID followed by anything
+        # other than a name or [ cannot be a declaration, so it skips straight to the ID case.
+        if token_type in _TYPE_TOKENS and types[self.pos + 1] in _DECL_LOOKAHEAD_TOKENS:
             start_pos = self.pos
             var_type = self.parse_type()
             
-            if self.current().type == TokenType.ID:
-                name = self.current().value
-                self.advance()
+            if types[self.pos] == _TT_ID:
+                name = self.values[self.pos]
+                self.pos += 1
                 
-                # Check what comes after the identifier
-                if self.current().type in (TokenType.ASSIGN, TokenType.SEMICOLON):
-                    # This is a variable declaration
-                    value = None
-                    if self.current().type == TokenType.ASSIGN:
-                        self.advance()
-                        value = self.parse_expr()
-                    self.expect(TokenType.SEMICOLON)
-                    return VarDecl(var_type, name, value)
-                elif self.current().type == TokenType.LPAREN:
-                    # This looks like a method call, not a declaration
-                    # Back up and parse as expression statement
+                if types[self.pos] == _TT_LPAREN:
+                    # Type followed by ID followed by ( is not a declaration in statement
+                    # context; back up and parse it as an expression statement
                     self.pos = start_pos
                     expr = self.parse_expr()
-                    self.expect(TokenType.SEMICOLON)
+                    self.expect(_TT_SEMICOLON)
                     return ExprStmt(expr)
-                else:
-                    # Unexpected token after ID in declaration context
-                    value = None
-                    if self.current().type == TokenType.ASSIGN:
-                        self.advance()
-                        value = self.parse_expr()
-                    self.expect(TokenType.SEMICOLON)
-                    return VarDecl(var_type, name, value)
-            else:
-                # Type not followed by ID - this is strange, back up
-                self.pos = start_pos
-        
-        # Assignment or expression with ID
-        if token.type == TokenType.ID:
-            name = token.value
-            self.advance()
-            
-            # Array assignment
-            if self.current().type == TokenType.LBRACKET:
-                self.advance()
-                index = self.parse_expr()
-                self.expect(TokenType.RBRACKET)
                 
-                if self.current().type == TokenType.ASSIGN:
-                    self.advance()
+                value = None
+                if types[self.pos] == _TT_ASSIGN:
+                    self.pos += 1
                     value = self.parse_expr()
-                    self.expect(TokenType.SEMICOLON)
-                    return ArrayAssign(name, index, value)
-                else:
-                    # Just array access as expression
-                    self.pos -= 3  # Back up to start of expression
-                    expr = self.parse_expr()
-                    self.expect(TokenType.SEMICOLON)
-                    return ExprStmt(expr)
+                if types[self.pos] != _TT_SEMICOLON:
+                    self._error_expected(_TT_SEMICOLON)
+                self.pos += 1
+                return VarDecl(var_type, name, value)
             
-            # Field assignment or method call
-            if self.current().type == TokenType.DOT:
-                # Parse the full postfix expression
-                self.pos -= 1  # Back up to the ID
-                expr = self.parse_expr()
-                
-                # Check if it's being assigned to (shouldn't happen for method calls)
-                if self.current().type == TokenType.ASSIGN and isinstance(expr, FieldAccess):
-                    self.advance()
-                    value = self.parse_expr()
-                    self.expect(TokenType.SEMICOLON)
-                    return FieldAssign(expr.obj, expr.field, value)
-                else:
-                    # It's an expression statement (method call or field access)
-                    self.expect(TokenType.SEMICOLON)
-                    return ExprStmt(expr)
+            # Type not followed by ID - this is strange, back up
+            self.pos = start_pos
+        
+        # Assignment or expression with ID, classified by the token after the name
+        if token_type == _TT_ID:
+            name = self.values[self.pos]
+            next_type = types[self.pos + 1]
             
             # Regular assignment
-            if self.current().type == TokenType.ASSIGN:
-                self.advance()
+            if next_type == _TT_ASSIGN:
+                self.pos += 2
                 value = self.parse_expr()
-                self.expect(TokenType.SEMICOLON)
+                if types[self.pos] != _TT_SEMICOLON:
+                    self._error_expected(_TT_SEMICOLON)
+                self.pos += 1
                 return Assign(name, value)
             
             # Compound assignment
-            if self.current().type == TokenType.PLUSASSIGN:
-                self.advance()
+            if next_type == _TT_PLUSASSIGN:
+                self.pos += 2
                 value = self.parse_expr()
-                self.expect(TokenType.SEMICOLON)
-                return Assign(name, BinOp('+', Variable(name), value))
+                if types[self.pos] != _TT_SEMICOLON:
+                    self._error_expected(_TT_SEMICOLON)
+                self.pos += 1
+                return CompoundAssign(name, _OP_ADD, value)
             
-            if self.current().type == TokenType.MINUSASSIGN:
-                self.advance()
+            if next_type == _TT_MINUSASSIGN:
+                self.pos += 2
                 value = self.parse_expr()
-                self.expect(TokenType.SEMICOLON)
-                return Assign(name, BinOp('-', Variable(name), value))
-            
-            # Method call or other expression
-            if self.current().type == TokenType.LPAREN:
-                # Back up and parse as full expression
-                self.pos -= 1
-                expr = self.parse_expr()
-                self.expect(TokenType.SEMICOLON)
-                return ExprStmt(expr)
+                if types[self.pos] != _TT_SEMICOLON:
+                    self._error_expected(_TT_SEMICOLON)
+                self.pos += 1
+                return CompoundAssign(name, _OP_SUB, value)
             
-            # Just a standalone identifier or increment/decrement
-            if self.current().type in (TokenType.PLUSPLUS, TokenType.MINUSMINUS):
-                self.pos -= 1
-                expr = self.parse_expr()
-                self.expect(TokenType.SEMICOLON)
-                return ExprStmt(expr)
+            # Array assignment
+            if next_type == _TT_LBRACKET:
+                start_pos = self.pos
+                self.pos += 2
+                index = self.parse_expr()
+                self.expect(_TT_RBRACKET)
+                
+                if types[self.pos] == _TT_ASSIGN:
+                    self.pos += 1
+                    value = self.parse_expr()
+                    if types[self.pos] != _TT_SEMICOLON:
+                        self._error_expected(_TT_SEMICOLON)
+                    self.pos += 1
+                    return ArrayAssign(name, index, value)
+                
+                # Just array access as expression
+                self.pos = start_pos
             
-            # Unknown case - treat as expression
-            self.pos -= 1
+            # Method call, field access or assignment, increment/decrement, or other expression
             expr = self.parse_expr()
-            self.expect(TokenType.SEMICOLON)
+            
+            if next_type == _TT_DOT and types[self.pos] == _TT_ASSIGN and isinstance(expr, FieldAccess):
+                self.pos += 1
+                value = self.parse_expr()
+                if types[self.pos] != _TT_SEMICOLON:
+                    self._error_expected(_TT_SEMICOLON)
+                self.pos += 1
+                return FieldAssign(expr.obj, expr.field, value)
+            
+            if types[self.pos] != _TT_SEMICOLON:
+                self._error_expected(_TT_SEMICOLON)
+            self.pos += 1
             return ExprStmt(expr)
         
         return None
     
+    def parse_break(self) -> Break:
+        self.pos += 1
+        self.expect(_TT_SEMICOLON)
+        return Break()
+    
+    def parse_continue(self) -> Continue:
+        self.pos += 1
+        self.expect(_TT_SEMICOLON)
+        return Continue()
+    
+    def parse_return(self) -> Return:
+        self.pos += 1
+        expr = None
+        if self.types[self.pos] != _TT_SEMICOLON:
+            expr = self.parse_expr()
+        if self.types[self.pos] != _TT_SEMICOLON:
+            self._error_expected(_TT_SEMICOLON)
+        self.pos += 1
+        return Return(expr)
+    
+    def parse_this_assign(self) -> FieldAssign:
+        """this.field = value;"""
+        self.pos += 1
+        self.expect(_TT_DOT)
+        
+        if self.types[self.pos] != _TT_ID:
+            self.error("Expected field name")
+        field_name = self.values[self.pos]
+        self.pos += 1
+        
+        self.expect(_TT_ASSIGN)
+        value = self.parse_expr()
+        self.expect(_TT_SEMICOLON)
+        return FieldAssign(Variable('this'), field_name, value)
+    
     def parse_if(self) -> If:
-        self.expect(TokenType.IF)
-        self.expect(TokenType.LPAREN)
+        self.pos += 1
+        if self.types[self.pos] != _TT_LPAREN:
+            self._error_expected(_TT_LPAREN)
+        self.pos += 1
         condition = self.parse_expr()
-        self.expect(TokenType.RPAREN)
+        if self.types[self.pos] != _TT_RPAREN:
+            self._error_expected(_TT_RPAREN)
+        self.pos += 1
         
         then_block = self.parse_block()
         else_block = []
         
-        if self.current().type == TokenType.ELSE:
-            self.advance()
-            if self.current().type == TokenType.IF:
+        if self.types[self.pos] == _TT_ELSE:
+            self.pos += 1
+            if self.types[self.pos] == _TT_IF:
                 else_block = [self.parse_if()]
             else:
                 else_block = self.parse_block()
@@ -1073,700 +1206,1699 @@ class Parser:
         return If(condition, then_block, else_block)
     
     def parse_while(self) -> While:
-        self.expect(TokenType.WHILE)
-        self.expect(TokenType.LPAREN)
+        self.pos += 1
+        if self.types[self.pos] != _TT_LPAREN:
+            self._error_expected(_TT_LPAREN)
+        self.pos += 1
         condition = self.parse_expr()
-        self.expect(TokenType.RPAREN)
+        if self.types[self.pos] != _TT_RPAREN:
+            self._error_expected(_TT_RPAREN)
+        self.pos += 1
         
         body = self.parse_block()
         return While(condition, body)
     
     def parse_do_while(self) -> DoWhile:
-        self.expect(TokenType.DO)
+        self.pos += 1
         body = self.parse_block()
-        self.expect(TokenType.WHILE)
-        self.expect(TokenType.LPAREN)
+        self.expect(_TT_WHILE)
+        self.expect(_TT_LPAREN)
         condition = self.parse_expr()
-        self.expect(TokenType.RPAREN)
-        self.expect(TokenType.SEMICOLON)
+        self.expect(_TT_RPAREN)
+        self.expect(_TT_SEMICOLON)
         return DoWhile(body, condition)
     
     def parse_for(self) -> Union[For, ForEach]:
-        self.expect(TokenType.FOR)
-        self.expect(TokenType.LPAREN)
-        
-        # Enhanced for loop
-        if self.is_type():
-            start_pos = self.pos
-            var_type = self.parse_type()
-            
-            if self.current().type == TokenType.ID:
-                var = self.current().value
-                self.advance()
-                
-                if self.current().type == TokenType.COLON:
-                    self.advance()
-                    iterable = self.parse_expr()
-                    self.expect(TokenType.RPAREN)
-                    body = self.parse_block()
-                    return ForEach(var_type, var, iterable, body)
+        self.pos += 1
+        if self.types[self.pos] != _TT_LPAREN:
+            self._error_expected(_TT_LPAREN)
+        self.pos += 1
+        
+        # Enhanced for loop - Type ([])* ID :, recognised from the token types alone
+        # so the header is only parsed once
+        types = self.types
+        if types[self.pos] in _TYPE_TOKENS:
+            i = self.pos + 1
+            while types[i] == _TT_LBRACKET and types[i + 1] == _TT_RBRACKET:
+                i += 2
             
-            self.pos = start_pos
+            if types[i] == _TT_ID and types[i + 1] == _TT_COLON:
+                var_type = self.parse_type()
+                var = self.values[self.pos]
+                self.pos += 2
+                iterable = self.parse_expr()
+                self.expect(_TT_RPAREN)
+                body = self.parse_block()
+                return ForEach(var_type, var, iterable, body)
         
         # Regular for loop
         init = None
-        if self.current().type != TokenType.SEMICOLON:
+        if self.types[self.pos] != _TT_SEMICOLON:
             init = self.parse_stmt()
         else:
-            self.advance()
+            self.pos += 1
         
         condition = None
-        if self.current().type != TokenType.SEMICOLON:
+        if self.types[self.pos] != _TT_SEMICOLON:
             condition = self.parse_expr()
-        self.expect(TokenType.SEMICOLON)
+        if self.types[self.pos] != _TT_SEMICOLON:
+            self._error_expected(_TT_SEMICOLON)
+        self.pos += 1
         
         update = None
-        if self.current().type != TokenType.RPAREN:
+        if self.types[self.pos] != _TT_RPAREN:
             update_expr = self.parse_expr()
             update = ExprStmt(update_expr)
         
-        self.expect(TokenType.RPAREN)
+        if self.types[self.pos] != _TT_RPAREN:
+            self._error_expected(_TT_RPAREN)
+        self.pos += 1
         body = self.parse_block()
         
         return For(init, condition, update, body)
     
     def parse_switch(self) -> Switch:
-        self.expect(TokenType.SWITCH)
-        self.expect(TokenType.LPAREN)
+        self.pos += 1
+        self.expect(_TT_LPAREN)
         expr = self.parse_expr()
-        self.expect(TokenType.RPAREN)
-        self.expect(TokenType.LBRACE)
+        self.expect(_TT_RPAREN)
+        self.expect(_TT_LBRACE)
         
         cases = []
         default = None
+        types = self.types
         
-        while self.current().type in (TokenType.CASE, TokenType.DEFAULT):
-            if self.current().type == TokenType.CASE:
-                self.advance()
+        while types[self.pos] in _LABEL_TOKENS:
+            if self.types[self.pos] == _TT_CASE:
+                self.pos += 1
                 value = self.parse_expr()
-                self.expect(TokenType.COLON)
+                self.expect(_TT_COLON)
                 
                 stmts = []
-                while self.current().type not in (TokenType.CASE, TokenType.DEFAULT, TokenType.RBRACE):
+                while types[self.pos] not in _CASE_END_TOKENS:
                     stmt = self.parse_stmt()
                     if stmt:
                         stmts.append(stmt)
                 
                 cases.append((value, stmts))
             
-            elif self.current().type == TokenType.DEFAULT:
-                self.advance()
-                self.expect(TokenType.COLON)
+            elif self.types[self.pos] == _TT_DEFAULT:
+                self.pos += 1
+                self.expect(_TT_COLON)
                 
                 default = []
-                while self.current().type not in (TokenType.CASE, TokenType.RBRACE):
+                while types[self.pos] not in _DEFAULT_END_TOKENS:
                     stmt = self.parse_stmt()
                     if stmt:
                         default.append(stmt)
         
-        self.expect(TokenType.RBRACE)
-        return Switch(expr, cases, default)
+        self.expect(_TT_RBRACE)
+        
+        case_index = None
+        if cases and all(type(value) in _CASE_LITERAL_NODES for value, _ in cases):
+            case_index = {}
+            for index, (value, _) in enumerate(cases):
+                case_index.setdefault(value.value, index)
+        
+        return Switch(expr, cases, default, case_index)
     
     def parse_try(self) -> Try:
-        self.expect(TokenType.TRY)
+        self.pos += 1
         try_block = self.parse_block()
         
         catch_blocks = []
-        while self.current().type == TokenType.CATCH:
-            self.advance()
-            self.expect(TokenType.LPAREN)
+        while self.types[self.pos] == _TT_CATCH:
+            self.pos += 1
+            self.expect(_TT_LPAREN)
             exception_type = self.parse_type()
-            var = self.current().value
-            self.expect(TokenType.ID)
-            self.expect(TokenType.RPAREN)
+            var = self.values[self.pos]
+            self.expect(_TT_ID)
+            self.expect(_TT_RPAREN)
             catch_body = self.parse_block()
             catch_blocks.append((exception_type, var, catch_body))
         
         finally_block = None
-        if self.current().type == TokenType.FINALLY:
-            self.advance()
+        if self.types[self.pos] == _TT_FINALLY:
+            self.pos += 1
             finally_block = self.parse_block()
         
         return Try(try_block, catch_blocks, finally_block)
     
     def parse_block(self) -> List[Stmt]:
-        if self.current().type == TokenType.LBRACE:
-            self.expect(TokenType.LBRACE)
+        types = self.types
+        if types[self.pos] == _TT_LBRACE:
+            self.pos += 1
             stmts = []
             
-            while self.current().type not in (TokenType.RBRACE, TokenType.EOF):
+            while types[self.pos] not in _BLOCK_END_TOKENS:
                 stmt = self.parse_stmt()
                 if stmt:
                     stmts.append(stmt)
             
-            self.expect(TokenType.RBRACE)
+            if types[self.pos] != _TT_RBRACE:
+                self._error_expected(_TT_RBRACE)
+            self.pos += 1
             return stmts
         else:
             # Single statement without braces
             stmt = self.parse_stmt()
             return [stmt] if stmt else []
     
+    def skip_block(self) -> Optional[tuple]:
+        """Step over a braced block without parsing it and return its token span.
+        Returns None (leaving pos alone) if there is no brace or it is never closed."""
+        start = self.pos
+        if self.types[start] != _TT_LBRACE:
+            return None
+        # Only brace tokens affect the depth, so let the regex engine skip everything else
+        depth = 0
+        for m in _BRACE_RE.finditer(self.types, start):
+            if m.group() == _LBRACE_BYTE:
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    self.pos = m.end()
+                    return (start, m.end())
+        return None
+    
+    def parse_span(self, span: tuple) -> List[Stmt]:
+        """Parse a block recorded by skip_block"""
+        saved_pos = self.pos
+        self.pos = span[0]
+        try:
+            return self.parse_block()
+        finally:
+            self.pos = saved_pos
+    
     # Class and method parsing
     
     def parse_modifiers(self) -> List[str]:
+        types = self.types
         modifiers = []
-        while self.current().type in (TokenType.PUBLIC, TokenType.PRIVATE, 
-                                       TokenType.PROTECTED, TokenType.STATIC, TokenType.FINAL):
-            modifiers.append(self.current().type.name.lower())
-            self.advance()
+        while types[self.pos] in _MODIFIER_NAMES:
+            modifiers.append(_MODIFIER_NAMES[types[self.pos]])
+            self.pos += 1
         return modifiers
     
-    def parse_method(self, modifiers: List[str]) -> MethodDecl:
-        return_type = self.parse_type()
-        
-        if self.current().type != TokenType.ID:
-            self.error("Expected method name")
-        name = self.current().value
-        self.advance()
-        
-        self.expect(TokenType.LPAREN)
-        params = []
-        if self.current().type != TokenType.RPAREN:
-            param_type = self.parse_type()
-            if self.current().type != TokenType.ID:
-                self.error("Expected parameter name")
-            param_name = self.current().value
-            self.advance()
-            params.append((param_type, param_name))
-            
-            while self.current().type == TokenType.COMMA:
-                self.advance()
-                param_type = self.parse_type()
-                if self.current().type != TokenType.ID:
-                    self.error("Expected parameter name")
-                param_name = self.current().value
-                self.advance()
-                params.append((param_type, param_name))
-        
-        self.expect(TokenType.RPAREN)
-        body = self.parse_block()
-        
-        return MethodDecl(modifiers, return_type, name, params, body)
+    def parse_param(self) -> tuple:
+        param_type = self.parse_type()
+        if self.types[self.pos] != _TT_ID:
+            self.error("Expected parameter name")
+        param_name = self.values[self.pos]
+        self.pos += 1
+        return (param_type, param_name)
+    
+    def parse_method(self, modifiers: List[str], return_type: str, name: str) -> MethodDecl:
+        """Parse the rest of a method whose return type and name the class body already read"""
+        self.expect(_TT_LPAREN)
+        params = self.parse_comma_list(self.parse_param, _PARAMS_END_TOKENS)
+        self.expect(_TT_RPAREN)
+        span = self.skip_block()
+        if span is None:
+            return MethodDecl(modifiers, return_type, name, params, self.parse_block())
+        
+        return MethodDecl(modifiers, return_type, name, params, None, span, self)
     
     def parse_class(self) -> ClassDecl:
         modifiers = self.parse_modifiers()
-        self.expect(TokenType.CLASS)
-        name = self.current().value
-        self.expect(TokenType.ID)
-        self.expect(TokenType.LBRACE)
+        self.expect(_TT_CLASS)
+        name = self.values[self.pos]
+        self.expect(_TT_ID)
+        self.expect(_TT_LBRACE)
         
         fields = []
         constructors = []
         methods = []
         
-        while self.current().type != TokenType.RBRACE and self.current().type != TokenType.EOF:
+        while self.types[self.pos] != _TT_RBRACE and self.types[self.pos] != _TT_EOF:
             member_mods = self.parse_modifiers()
             
             # Constructor (same name as class)
-            if self.current().type == TokenType.ID and self.current().value == name:
-                self.advance()
-                self.expect(TokenType.LPAREN)
-                params = []
-                
-                # Parse constructor parameters
-                if self.current().type != TokenType.RPAREN:
-                    param_type = self.parse_type()
-                    if self.current().type != TokenType.ID:
-                        self.error("Expected parameter name")
-                    param_name = self.current().value
-                    self.advance()
-                    params.append((param_type, param_name))
-                    
-                    while self.current().type == TokenType.COMMA:
-                        self.advance()
-                        param_type = self.parse_type()
-                        if self.current().type != TokenType.ID:
-                            self.error("Expected parameter name")
-                        param_name = self.current().value
-                        self.advance()
-                        params.append((param_type, param_name))
-                
-                self.expect(TokenType.RPAREN)
-                body = self.parse_block()
-                constructors.append(Constructor(member_mods, name, params, body))
+            if self.types[self.pos] == _TT_ID and self.values[self.pos] == name:
+                self.pos += 1
+                self.expect(_TT_LPAREN)
+                params = self.parse_comma_list(self.parse_param, _PARAMS_END_TOKENS)
+                self.expect(_TT_RPAREN)
+                span = self.skip_block()
+                if span is None:
+                    constructors.append(Constructor(member_mods, name, params, self.parse_block()))
+                else:
+                    constructors.append(Constructor(member_mods, name, params, None, span, self))
             
             # Method or field
             elif self.is_type():
-                start_pos = self.pos
                 member_type = self.parse_type()
                 
-                if self.current().type != TokenType.ID:
+                if self.types[self.pos] != _TT_ID:
                     self.error("Expected member name")
-                member_name = self.current().value
-                self.advance()
+                member_name = self.values[self.pos]
+                self.pos += 1
                 
-                if self.current().type == TokenType.LPAREN:
-                    # It's a method - reset and parse properly
-                    self.pos = start_pos
-                    methods.append(self.parse_method(member_mods))
+                if self.types[self.pos] == _TT_LPAREN:
+                    # It's a method
+                    methods.append(self.parse_method(member_mods, member_type, member_name))
                 else:
                     # It's a field
                     value = None
-                    if self.current().type == TokenType.ASSIGN:
-                        self.advance()
+                    if self.types[self.pos] == _TT_ASSIGN:
+                        self.pos += 1
                         value = self.parse_expr()
-                    self.expect(TokenType.SEMICOLON)
+                    self.expect(_TT_SEMICOLON)
                     fields.append(FieldDecl(member_mods, member_type, member_name, value))
             else:
                 self.advance()
         
-        self.expect(TokenType.RBRACE)
+        self.expect(_TT_RBRACE)
         return ClassDecl(modifiers, name, fields, constructors, methods)
     
     def parse_program(self):
         classes = []
         stmts = []
         
-        while self.current().type != TokenType.EOF:
-            if self.current().type in (TokenType.PUBLIC, TokenType.PRIVATE, TokenType.CLASS):
+        while self.types[self.pos] != _TT_EOF:
+            if self.types[self.pos] in _CLASS_START_TOKENS:
                 classes.append(self.parse_class())
-            elif self.is_type() or self.current().type in (TokenType.IF, TokenType.WHILE, 
-                                                             TokenType.FOR, TokenType.ID):
+            elif self.is_type() or self.types[self.pos] in _STMT_START_TOKENS:
                 stmt = self.parse_stmt()
                 if stmt:
                     stmts.append(stmt)
             else:
-                self.advance()
+                self.pos += 1
         
         return classes, stmts
 
+_LITERAL_NODES = {
+    _TT_FLOAT: FloatLit, _TT_STRING: StringLit, _TT_CHAR: CharLit,
+}
+
+# Case labels a switch can look up by value instead of comparing one by one
+_CASE_LITERAL_NODES = (IntLit, CharLit, StringLit)
+
+# Shared nodes for the literals programs repeat most. Nothing writes to an AST node
+# after parsing, so one instance can sit at every place the literal appears.
+_SMALL_INT_LITS = {value: IntLit(value) for value in range(257)}
+_TRUE_LIT = BoolLit(True)
+_FALSE_LIT = BoolLit(False)
+_NULL_LIT = NullLit()
+
+# Parser method for each token that can start a primary expression
+_PRIMARY_PARSERS = {
+    _TT_INT: Parser.parse_int_literal, _TT_FLOAT: Parser.parse_literal,
+    _TT_STRING: Parser.parse_literal, _TT_CHAR: Parser.parse_literal,
+    _TT_TRUE: Parser.parse_bool_literal, _TT_FALSE: Parser.parse_bool_literal,
+    _TT_NULL: Parser.parse_null, _TT_THIS: Parser.parse_this,
+    _TT_NEW: Parser.parse_new, _TT_LBRACE: Parser.parse_array_init,
+    _TT_ID: Parser.parse_name, _TT_LPAREN: Parser.parse_paren,
+}
+
+# Parser method for each keyword that starts a statement. Each is entered with pos on
+# its keyword, which it steps over without re-checking.
+_STMT_PARSERS = {
+    _TT_IF: Parser.parse_if, _TT_WHILE: Parser.parse_while,
+    _TT_DO: Parser.parse_do_while, _TT_FOR: Parser.parse_for,
+    _TT_SWITCH: Parser.parse_switch, _TT_TRY: Parser.parse_try,
+    _TT_BREAK: Parser.parse_break, _TT_CONTINUE: Parser.parse_continue,
+    _TT_RETURN: Parser.parse_return, _TT_THIS: Parser.parse_this_assign,
+}
+
+# ===========================
+# COMPILER (AST -> bytecode)
+# ===========================
+
+class Opcode(IntEnum):
+    LOAD_CONST = auto()
+    LOAD_LOCAL = auto()
+    LOAD_NAME = auto()
+    LOAD_THIS = auto()
+    STORE_LOCAL = auto()
+    STORE_NAME = auto()
+    POP_TOP = auto()
+    PY_EXPR = auto()
+    PY_JUMP_IF_FALSE = auto()
+    PY_JUMP_IF_TRUE = auto()
+    BINARY_ADD = auto()
+    BINARY_OP = auto()
+    UNARY_NOT = auto()
+    UNARY_NEG = auto()
+    INCREMENT_LOCAL = auto()
+    INCR_LOCAL = auto()
+    DECR_LOCAL = auto()
+    INCREMENT = auto()
+    CAST = auto()
+    BUILD_LIST = auto()
+    NEW_ARRAY = auto()
+    BINARY_SUBSCR = auto()
+    STORE_SUBSCR = auto()
+    LOAD_FIELD = auto()
+    STORE_FIELD = auto()
+    NEW_OBJECT = auto()
+    CALL_PRINT = auto()
+    CALL_MATH = auto()
+    CALL_METHOD = auto()
+    CALL_GLOBAL = auto()
+    JUMP = auto()
+    JUMP_IF_FALSE = auto()
+    JUMP_IF_TRUE = auto()
+    JUMP_IF_FALSE_OR_POP = auto()
+    JUMP_IF_TRUE_OR_POP = auto()
+    JUMP_IF_NOT_OBJECT = auto()
+    CASE_JUMP = auto()
+    SWITCH = auto()
+    GET_ITER = auto()
+    FOR_ITER = auto()
+    FOR_ITER_LOCAL = auto()
+    TRY = auto()
+    RETURN_VALUE = auto()
+    BLOCK_RETURN = auto()
+    RAISE_RETURN = auto()
+    RAISE_BREAK = auto()
+    RAISE_CONTINUE = auto()
+
+@dataclass(eq=False, slots=True)
+class Code:
+    instructions: List[tuple]  # [(opcode, arg), ...]
+    # Statement ranges that catch a BreakException/ContinueException raised inside them,
+    # innermost first: [(start, end, break_pc, continue_pc or None, stack_depth), ...]
+    loops: List[tuple]
+    nlocals: int = 0  # frame size for a method or constructor body
+    padding: tuple = ()  # Nones that extend a call's arguments to the full frame
+    # The instructions with each opcode replaced by its handler function: [(handler, arg), ...]
+    threaded: List[tuple] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self.threaded = [(_HANDLERS[opcode], arg) for opcode, arg in self.instructions]
+
+    def escape(self, exc: Exception, pc: int, stack: list) -> int:
+        """Where a break/continue raised at pc resumes, trimming the operand stack to match"""
+        is_break = isinstance(exc, BreakException)
+        for start, end, break_pc, continue_pc, depth in self.loops:
+            if start <= pc < end and (is_break or continue_pc is not None):
+                del stack[depth:]
+                return break_pc if is_break else continue_pc
+        raise exc
+
+# What the code of a try, catch or finally block returns when break, continue or return
+# leaves it; the TRY instruction then carries out the same jump in the enclosing code
+_EXIT_BREAK = object()
+_EXIT_CONTINUE = object()
+_EXIT_RETURN = object()  # the returned value is in Evaluator.return_value
+
+class Compiler:
+    """Lowers a statement list (a method body, constructor, top-level program or try block)
+    to a Code object. Break and continue inside a loop or switch of the same list become
+    jumps, and so does return in a method body. A try block's code ends with an _EXIT_*
+    value for them instead. What is left (break outside any loop, return from top-level
+    statements) raises the matching exception.
+
+    Parameters and local variables of a method are resolved to slots in the frame the
+    evaluator allocates per call. Any other name (a field of the current object, or a
+    variable of a program without main) is looked up by name when it runs. Locals that
+    can never hold a string are added with a plain + instead of the concatenation check."""
+
+    def __init__(self, scope: Optional[Dict[str, int]] = None, in_method: bool = False,
+                 block: bool = False, non_strings: frozenset = frozenset()):
+        self.instructions: List[tuple] = []
+        self.loops: List[tuple] = []
+        # Enclosing loops/switches: [break patch list, continue patch list or None]
+        self.targets: List[list] = []
+        self.scope = scope  # local name -> frame slot, shared with nested try blocks
+        self.in_method = in_method
+        self.block = block  # compiling a try, catch or finally block
+        self.non_strings = non_strings  # locals no assignment can make a string
+        self.exits = set()  # _EXIT_* values this block's code can end with
+        self.depth = 0  # operand stack entries held across statements (foreach iterators)
+        # Expressions lowered to Python: [(PY_EXPR instruction index, source, constants), ...]
+        self.lowered: List[tuple] = []
+        self.temps = 0
+        # (type, value) -> the one constant object this body's instructions use for it
+        self.constants: Dict[tuple, Any] = {}
+
+    @classmethod
+    def compile_method(cls, method: Union[MethodDecl, Constructor]) -> Code:
+        scope = {param_name: slot for slot, (param_type, param_name) in enumerate(method.params)}
+        non_strings = _non_string_locals(scope, method.body)
+        code = cls(scope, in_method=True, non_strings=non_strings).compile_body(method.body)
+        code.padding = (None,) * (code.nlocals - len(method.params))
+        return code
+
+    def compile_body(self, stmts: List[Stmt]) -> Code:
+        for stmt in stmts:
+            self.compile_stmt(stmt)
+        self.emit(Opcode.LOAD_CONST, None)
+        self.emit(Opcode.RETURN_VALUE)
+        self.link_lowered()
+        return Code(self.instructions, self.loops, len(self.scope) if self.scope else 0)
+
+    def compile_field_values(self, fields: List[FieldDecl]) -> Code:
+        """Code returning a list with each field's initial value, in declaration order"""
+        for field_decl in fields:
+            if field_decl.value:
+                self.compile_expr(field_decl.value)
+            else:
+                self.emit(Opcode.LOAD_CONST, None)
+        self.emit(Opcode.BUILD_LIST, len(fields))
+        self.emit(Opcode.RETURN_VALUE)
+        self.link_lowered()
+        return Code(self.instructions, self.loops)
+
+    def nested(self) -> 'Compiler':
+        """Compiler for a try, catch or finally block, run as its own code in the same frame"""
+        compiler = Compiler(self.scope, block=True, non_strings=self.non_strings)
+        compiler.constants = self.constants
+        return compiler
+
+    def declare(self, name: str) -> Optional[int]:
+        """Slot for a local declared in this body (None outside methods)"""
+        if self.scope is None:
+            return None
+        slot = self.scope.get(name)
+        if slot is None:
+            slot = self.scope[name] = len(self.scope)
+        return slot
+
+    def emit_load(self, name: str):
+        slot = self.scope.get(name) if self.scope else None
+        if slot is None:
+            self.emit(Opcode.LOAD_NAME, name)
+        else:
+            self.emit(Opcode.LOAD_LOCAL, slot)
+
+    def emit_store(self, name: str, slot: Optional[int] = None):
+        if slot is None and self.scope:
+            slot = self.scope.get(name)
+        if slot is None:
+            self.emit(Opcode.STORE_NAME, name)
+        else:
+            self.emit(Opcode.STORE_LOCAL, slot)
+
+    def constant(self, value):
+        """The shared object for a literal value (1, 1.0 and True stay distinct)"""
+        key = (float, value.hex()) if type(value) is float else (type(value), value)  # keeps -0.0
+        return self.constants.setdefault(key, value)
+
+    def emit(self, opcode: Opcode, arg=None) -> int:
+        self.instructions.append((int(opcode), arg))
+        return len(self.instructions) - 1
+
+    def patch(self, index: int, target: int = None):
+        """Point the jump at index to target (default: the next instruction emitted)"""
+        opcode, _ = self.instructions[index]
+        self.instructions[index] = (opcode, len(self.instructions) if target is None else target)
+
+    def compile_block(self, stmts: List[Stmt]):
+        for stmt in stmts:
+            self.compile_stmt(stmt)
+
+    def compile_loop_body(self, body: List[Stmt], targets: list) -> int:
+        """Compile body with break/continue bound to targets; returns the body's start index"""
+        start = len(self.instructions)
+        self.targets.append(targets)
+        self.compile_block(body)
+        self.targets.pop()
+        return start
+
+    def emit_binary(self, op: str, maybe_string: bool = True):
+        """Combine the two values on top of the stack with op"""
+        if op == _OP_ADD:
+            if maybe_string:
+                self.emit(Opcode.BINARY_ADD)
+            else:
+                self.emit(Opcode.BINARY_OP, operator.add)
+        elif op in _BINARY_FUNCS:
+            self.emit(Opcode.BINARY_OP, _BINARY_FUNCS[op])
+        else:
+            self.emit(Opcode.POP_TOP)
+            self.emit(Opcode.POP_TOP)
+            self.emit(Opcode.LOAD_CONST, None)
+
+    def compile_stmt(self, stmt: Stmt):
+        compile_node = _STMT_COMPILERS.get(type(stmt))
+        if compile_node is not None:
+            compile_node(self, stmt)
+
+    def finish_loop(self, start: int, end: int, breaks: list, continues: list,
+                    continue_pc: int, break_pc: int = None):
+        """Resolve a loop's break/continue jumps and record its body range for escapes"""
+        if break_pc is None:
+            break_pc = len(self.instructions)
+        for jump in breaks:
+            self.patch(jump, break_pc)
+        for jump in continues:
+            self.patch(jump, continue_pc)
+        self.loops.append((start, end, break_pc, continue_pc, self.depth))
+
+    def compile_expr(self, expr: Expr):
+        expr_type = type(expr)
+        if expr_type in _LOWERABLE_ROOTS and self.scope is not None and self.lower(expr) is not None:
+            return
+        compile_node = _EXPR_COMPILERS.get(expr_type)
+        if compile_node is None:
+            self.emit(Opcode.LOAD_CONST, None)
+        else:
+            compile_node(self, expr)
+
+    def lower(self, expr: Expr, opcode: Opcode = Opcode.PY_EXPR) -> Optional[int]:
+        """Emit expr as one PY_EXPR (or PY_JUMP_IF_*) instruction if it only combines
+        locals and literals; returns the instruction's index"""
+        constants = []
+        source = self.python_source(expr, constants)
+        if source is None:
+            return None
+        index = self.emit(opcode)
+        self.lowered.append((index, source, constants))
+        return index
+
+    def emit_jump_if(self, condition: Expr, when: bool) -> int:
+        """Evaluate condition and jump if its truth equals when; returns the jump to patch"""
+        if type(condition) in _LOWERABLE_ROOTS and self.scope is not None:
+            index = self.lower(condition, Opcode.PY_JUMP_IF_TRUE if when else Opcode.PY_JUMP_IF_FALSE)
+            if index is not None:
+                return index
+        self.compile_expr(condition)
+        return self.emit(Opcode.JUMP_IF_TRUE if when else Opcode.JUMP_IF_FALSE)
+
+    def python_source(self, expr: Expr, constants: list) -> Optional[str]:
+        """Python expression over frame computing expr the way the instructions would,
+        or None if expr reads anything other than a local or literal"""
+        expr_type = type(expr)
+        if expr_type is Variable:
+            slot = self.scope.get(expr.name)
+            return None if slot is None else f'frame[{slot}]'
+        if expr_type in _LOWERABLE_LITERALS:
+            value = self.constant(expr.value)
+            for i, known in enumerate(constants):
+                if known is value:
+                    return f'c{i}'
+            constants.append(value)
+            return f'c{len(constants) - 1}'
+        if expr_type is NullLit:
+            return 'None'
+
+        if expr_type is BinOp:
+            left = self.python_source(expr.left, constants)
+            right = self.python_source(expr.right, constants) if left is not None else None
+            if right is None:
+                return None
+            op = expr.op
+            if op == _OP_AND:
+                return f'({left} and {right})'
+            if op == _OP_OR:
+                return f'({left} or {right})'
+            if op == _OP_ADD:
+                if (_is_non_string(expr.left, self.non_strings)
+                        and _is_non_string(expr.right, self.non_strings)):
+                    return f'({left} + {right})'
+                # Both operands are evaluated (| does not short-circuit) before the
+                # string check picks concatenation or addition
+                a, b = f't{self.temps}', f't{self.temps + 1}'
+                self.temps += 2
+                return (f'(str({a}) + str({b}) if (type({a} := {left}) is str) '
+                        f'| (type({b} := {right}) is str) else {a} + {b})')
+            if op == _OP_DIV:
+                return f'_divide({left}, {right})'
+            if op in _BINARY_FUNCS:
+                return f'({left} {op} {right})'
+            return None
+
+        if expr_type is UnaryOp:
+            if expr.op != _OP_NOT and expr.op != _OP_NEG:
+                return None
+            operand = self.python_source(expr.operand, constants)
+            if operand is None:
+                return None
+            return f'(not {operand})' if expr.op == _OP_NOT else f'(-{operand})'
+
+        if expr_type is TernaryOp:
+            condition = self.python_source(expr.condition, constants)
+            true_value = self.python_source(expr.true_expr, constants) if condition is not None else None
+            false_value = self.python_source(expr.false_expr, constants) if true_value is not None else None
+            if false_value is None:
+                return None
+            return f'({true_value} if {condition} else {false_value})'
+
+        return None
+
+    def link_lowered(self):
+        """Compile this body's lowered expressions in one pass and put the resulting
+        functions into their PY_EXPR instructions"""
+        if not self.lowered:
+            return
+        namespace = {'_divide': _divide}
+        functions = []
+        for n, (index, source, constants) in enumerate(self.lowered):
+            params = ''
+            for i, value in enumerate(constants):
+                namespace[f'k{n}_{i}'] = value
+                params += f', c{i}=k{n}_{i}'
+            functions.append(f'def e{n}(frame{params}):\n    return {source}\n')
+        exec(compile(''.join(functions), '<compiled expressions>', 'exec'), namespace)
+        for n, (index, source, constants) in enumerate(self.lowered):
+            opcode, target = self.instructions[index]
+            func = namespace[f'e{n}']
+            # A PY_JUMP_IF_* keeps the jump target patched in while compiling
+            self.instructions[index] = (opcode, func if opcode == Opcode.PY_EXPR else (func, target))
+
+    def compile_var_decl(self, stmt: VarDecl):
+        if stmt.value:
+            self.compile_expr(stmt.value)
+        else:
+            default = Evaluator.get_default_value(stmt.var_type)
+            if isinstance(default, list):
+                self.emit(Opcode.BUILD_LIST, 0)  # a new array per declaration
+            else:
+                self.emit(Opcode.LOAD_CONST, self.constant(default))
+        self.emit_store(stmt.name, self.declare(stmt.name))
+
+    def compile_assign(self, stmt: Assign):
+        self.compile_expr(stmt.value)
+        self.emit_store(stmt.target)
+
+    def compile_compound_assign(self, stmt: CompoundAssign):
+        # x -= v subtracts; every other compound operator behaves as +=
+        self.emit_load(stmt.target)
+        self.compile_expr(stmt.value)
+        if stmt.op == _OP_SUB:
+            self.emit_binary(_OP_SUB)
+        else:
+            self.emit_binary(_OP_ADD, stmt.target not in self.non_strings
+                             or not _is_non_string(stmt.value, self.non_strings))
+        self.emit_store(stmt.target)
+
+    def compile_array_assign(self, stmt: ArrayAssign):
+        self.emit_load(stmt.array)
+        self.compile_expr(stmt.index)
+        self.compile_expr(stmt.value)
+        self.emit(Opcode.STORE_SUBSCR)
+
+    def compile_field_assign(self, stmt: FieldAssign):
+        # The value is only evaluated when the target really is an object
+        self.compile_expr(stmt.obj)
+        skip = self.emit(Opcode.JUMP_IF_NOT_OBJECT)
+        self.compile_expr(stmt.value)
+        # [name, field_index last seen, its slot]: filled in as the store runs
+        self.emit(Opcode.STORE_FIELD, [stmt.field, None, None])
+        self.patch(skip)
+
+    def compile_if(self, stmt: If):
+        to_else = self.emit_jump_if(stmt.condition, False)
+        self.compile_block(stmt.then_block)
+        if stmt.else_block:
+            to_end = self.emit(Opcode.JUMP)
+            self.patch(to_else)
+            self.compile_block(stmt.else_block)
+            self.patch(to_end)
+        else:
+            self.patch(to_else)
+
+    def emit_loop_test(self, condition: Expr, scope: Optional[Dict[str, int]], start: int):
+        """Jump back to a loop body at start while condition holds. The test is placed after
+        the body but resolves names in scope, the locals declared before the loop, so a
+        body local never hides the field or outer name the condition means."""
+        body_scope = self.scope
+        self.scope = scope
+        self.patch(self.emit_jump_if(condition, True), start)
+        self.scope = body_scope
+
+    def compile_while(self, stmt: While):
+        # The condition is tested after the body, so an iteration takes a single jump
+        scope = dict(self.scope) if self.scope is not None else None
+        to_test = self.emit(Opcode.JUMP)
+        breaks, continues = [], []
+        start = self.compile_loop_body(stmt.body, [breaks, continues])
+        test = len(self.instructions)
+        self.patch(to_test)
+        self.emit_loop_test(stmt.condition, scope, start)
+        self.finish_loop(start, test, breaks, continues, test)
+
+    def compile_do_while(self, stmt: DoWhile):
+        breaks, continues = [], []
+        top = self.compile_loop_body(stmt.body, [breaks, continues])
+        condition = len(self.instructions)
+        self.patch(self.emit_jump_if(stmt.condition, True), top)
+        self.finish_loop(top, condition, breaks, continues, condition)
+
+    def compile_for(self, stmt: For):
+        if stmt.init:
+            self.compile_stmt(stmt.init)
+        # Laid out like while: body, update, then the condition jumping back to the body
+        scope = dict(self.scope) if self.scope is not None else None
+        to_test = self.emit(Opcode.JUMP) if stmt.condition else None
+        breaks, continues = [], []
+        start = self.compile_loop_body(stmt.body, [breaks, continues])
+        update = len(self.instructions)
+        if stmt.update:
+            self.compile_stmt(stmt.update)
+        if to_test is not None:
+            self.patch(to_test)
+            self.emit_loop_test(stmt.condition, scope, start)
+        else:
+            self.emit(Opcode.JUMP, start)
+        self.finish_loop(start, update, breaks, continues, update)
+
+    def compile_for_each(self, stmt: ForEach):
+        emit = self.emit
+        self.compile_expr(stmt.iterable)
+        emit(Opcode.GET_ITER)
+        self.depth += 1
+        slot = self.declare(stmt.var)
+        if slot is None:
+            top = emit(Opcode.FOR_ITER)
+            self.emit_store(stmt.var)
+        else:
+            top = emit(Opcode.FOR_ITER_LOCAL)  # stores each item straight into the slot
+        breaks, continues = [], []
+        start = self.compile_loop_body(stmt.body, [breaks, continues])
+        end = emit(Opcode.JUMP, top)
+        # break leaves the iterator on the stack; exhaustion has already popped it
+        break_pc = emit(Opcode.POP_TOP)
+        self.finish_loop(start, end, breaks, continues, top, break_pc)
+        exhausted = len(self.instructions)
+        self.instructions[top] = (self.instructions[top][0],
+                                  exhausted if slot is None else (slot, exhausted))
+        self.depth -= 1
+
+    def compile_switch(self, stmt: Switch):
+        emit = self.emit
+        self.compile_expr(stmt.expr)
+        case_jumps = []
+        if stmt.case_index is not None:
+            # Literal labels: one lookup in a value -> case table, filled in below
+            to_default = emit(Opcode.SWITCH)
+        else:
+            for value, _ in stmt.cases:
+                self.compile_expr(value)
+                case_jumps.append(emit(Opcode.CASE_JUMP))
+            emit(Opcode.POP_TOP)
+            to_default = emit(Opcode.JUMP)
+
+        # Matched cases fall through into the ones after them; break leaves the switch.
+        # default is not part of that range, so a break there reaches the enclosing loop.
+        breaks = []
+        start = len(self.instructions)
+        self.targets.append([breaks, None])
+        case_starts = []
+        for _, stmts in stmt.cases:
+            case_starts.append(len(self.instructions))
+            self.compile_block(stmts)
+        self.targets.pop()
+        for jump, case_start in zip(case_jumps, case_starts):
+            self.patch(jump, case_start)
+        to_end = emit(Opcode.JUMP)
+        if stmt.case_index is not None:
+            table = {value: case_starts[index] for value, index in stmt.case_index.items()}
+            self.instructions[to_default] = (self.instructions[to_default][0],
+                                             (table, len(self.instructions)))
+        else:
+            self.patch(to_default)
+        if stmt.default:
+            self.compile_block(stmt.default)
+        end = len(self.instructions)
+        self.patch(to_end, end)
+        for jump in breaks:
+            self.patch(jump, end)
+        self.loops.append((start, to_end, end, None, self.depth))
+
+    def compile_break(self, stmt: Optional[Break] = None):
+        if self.targets:
+            self.targets[-1][0].append(self.emit(Opcode.JUMP))
+        elif self.block:
+            self.emit_exit(_EXIT_BREAK)
+        else:
+            self.emit(Opcode.RAISE_BREAK)
+
+    def compile_continue(self, stmt: Optional[Continue] = None):
+        for _, continues in reversed(self.targets):
+            if continues is not None:
+                continues.append(self.emit(Opcode.JUMP))
+                break
+        else:
+            if self.block:
+                self.emit_exit(_EXIT_CONTINUE)
+            else:
+                self.emit(Opcode.RAISE_CONTINUE)
+
+    def compile_return(self, stmt: Return):
+        if stmt.expr:
+            self.compile_expr(stmt.expr)
+        else:
+            self.emit(Opcode.LOAD_CONST, None)
+        self.emit_return()
+
+    def emit_return(self):
+        """Return the value on top of the stack"""
+        if self.in_method:
+            self.emit(Opcode.RETURN_VALUE)
+        elif self.block:
+            self.exits.add(_EXIT_RETURN)
+            self.emit(Opcode.BLOCK_RETURN)
+        else:
+            self.emit(Opcode.RAISE_RETURN)
+
+    def emit_exit(self, exit_value):
+        self.exits.add(exit_value)
+        self.emit(Opcode.LOAD_CONST, exit_value)
+        self.emit(Opcode.RETURN_VALUE)
+
+    def compile_expr_stmt(self, stmt: ExprStmt):
+        expr = stmt.expr
+        # i++; and i--; on a local update the slot without producing a value
+        if type(expr) is UnaryOp and expr.op in _INCREMENT_STEPS and type(expr.operand) is Variable:
+            slot = self.scope.get(expr.operand.name) if self.scope else None
+            if slot is not None:
+                self.emit(_INCREMENT_STEPS[expr.op], slot)
+                return
+        self.compile_expr(expr)
+        self.emit(Opcode.POP_TOP)
+
+    def compile_try(self, stmt: Try):
+        # Each block runs as its own code so the evaluator can wrap it in a Python try
+        blocks = [self.nested()]
+        try_code = blocks[0].compile_body(stmt.try_block)
+        catches = []
+        for exception_type, var, stmts in stmt.catch_blocks:
+            blocks.append(self.nested())
+            catches.append((var, self.declare(var), blocks[-1].compile_body(stmts)))
+        finally_code = None
+        if stmt.finally_block:
+            blocks.append(self.nested())
+            finally_code = blocks[-1].compile_body(stmt.finally_block)
+        index = self.emit(Opcode.TRY)
+
+        # Where TRY continues when a block ended with break, continue or return: code
+        # doing the same from here (a return finds its value pushed on the stack)
+        exits = {}
+        exit_values = set().union(*(block.exits for block in blocks))
+        if exit_values:
+            to_end = self.emit(Opcode.JUMP)
+            if _EXIT_BREAK in exit_values:
+                exits[_EXIT_BREAK] = len(self.instructions)
+                self.compile_break()
+            if _EXIT_CONTINUE in exit_values:
+                exits[_EXIT_CONTINUE] = len(self.instructions)
+                self.compile_continue()
+            if _EXIT_RETURN in exit_values:
+                exits[_EXIT_RETURN] = len(self.instructions)
+                self.emit_return()
+            self.patch(to_end)
+        self.instructions[index] = (self.instructions[index][0], (try_code, catches, finally_code, exits))
+
+    def compile_literal(self, expr: Expr):
+        self.emit(Opcode.LOAD_CONST, self.constant(expr.value))
+
+    def compile_null_lit(self, expr: NullLit):
+        self.emit(Opcode.LOAD_CONST, None)
+
+    def compile_variable(self, expr: Variable):
+        if expr.name == 'this':
+            self.emit(Opcode.LOAD_THIS)
+        else:
+            self.emit_load(expr.name)
+
+    def compile_bin_op(self, expr: BinOp):
+        self.compile_expr(expr.left)
+        # Short-circuit: && and || leave the deciding operand as the result
+        if expr.op == _OP_AND or expr.op == _OP_OR:
+            jump = self.emit(Opcode.JUMP_IF_FALSE_OR_POP if expr.op == _OP_AND else Opcode.JUMP_IF_TRUE_OR_POP)
+            self.compile_expr(expr.right)
+            self.patch(jump)
+        else:
+            self.compile_expr(expr.right)
+            self.emit_binary(expr.op, expr.op != _OP_ADD
+                             or not _is_non_string(expr.left, self.non_strings)
+                             or not _is_non_string(expr.right, self.non_strings))
+
+    def compile_unary_op(self, expr: UnaryOp):
+        emit = self.emit
+        if expr.op == _OP_NOT:
+            self.compile_expr(expr.operand)
+            emit(Opcode.UNARY_NOT)
+        elif expr.op == _OP_NEG:
+            self.compile_expr(expr.operand)
+            emit(Opcode.UNARY_NEG)
+        elif isinstance(expr.operand, Variable):
+            # (slot or name, increments, yields the old value)
+            name = expr.operand.name
+            slot = self.scope.get(name) if self.scope else None
+            emit(Opcode.INCREMENT if slot is None else Opcode.INCREMENT_LOCAL,
+                 (name if slot is None else slot,
+                  expr.op in (_OP_PRE_INC, _OP_POST_INC),
+                  expr.op in (_OP_POST_INC, _OP_POST_DEC)))
+        else:
+            emit(Opcode.LOAD_CONST, None)
+
+    def compile_ternary_op(self, expr: TernaryOp):
+        self.compile_expr(expr.condition)
+        to_false = self.emit(Opcode.JUMP_IF_FALSE)
+        self.compile_expr(expr.true_expr)
+        to_end = self.emit(Opcode.JUMP)
+        self.patch(to_false)
+        self.compile_expr(expr.false_expr)
+        self.patch(to_end)
+
+    def compile_cast(self, expr: Cast):
+        self.compile_expr(expr.expr)
+        convert = _cast_function(expr.target_type)
+        if convert is not None:
+            self.emit(Opcode.CAST, convert)
+
+    def compile_new_array(self, expr: NewArray):
+        if expr.sizes:
+            self.compile_expr(expr.sizes[0])
+            self.emit(Opcode.NEW_ARRAY, expr.element_type)
+        else:
+            self.emit(Opcode.BUILD_LIST, 0)
+
+    def compile_array_init(self, expr: ArrayInit):
+        for element in expr.elements:
+            self.compile_expr(element)
+        self.emit(Opcode.BUILD_LIST, len(expr.elements))
+
+    def compile_array_access(self, expr: ArrayAccess):
+        self.compile_expr(expr.array)
+        self.compile_expr(expr.index)
+        self.emit(Opcode.BINARY_SUBSCR)
+
+    def compile_field_access(self, expr: FieldAccess):
+        self.compile_expr(expr.obj)
+        # [name, field_index last seen, its slot]: filled in as the load runs
+        self.emit(Opcode.LOAD_FIELD, [expr.field, None, None])
+
+    def compile_new_object(self, expr: NewObject):
+        for arg in expr.args:
+            self.compile_expr(arg)
+        self.emit(Opcode.NEW_OBJECT, (expr.class_name, len(expr.args)))
+
+    def compile_method_call(self, expr: MethodCall):
+        emit = self.emit
+        for arg in expr.args:
+            self.compile_expr(arg)
+        nargs = len(expr.args)
+
+        if expr.method in ('println', 'print'):
+            emit(Opcode.CALL_PRINT, (expr.method == 'println', nargs))
+        elif isinstance(expr.obj, Variable) and expr.obj.name == 'Math' and expr.method in _MATH_FUNCS:
+            emit(Opcode.CALL_MATH, (_MATH_FUNCS[expr.method], nargs))
+        elif expr.obj:
+            # The receiver is evaluated after the arguments
+            self.compile_expr(expr.obj)
+            # [name, nargs, string method or None, class name last seen, its method]:
+            # the last two are filled in as the call runs
+            emit(Opcode.CALL_METHOD, [expr.method, nargs, _STRING_METHODS.get(expr.method), None, None])
+        else:
+            emit(Opcode.CALL_GLOBAL, (expr.method, nargs))
+
+
+# Expressions the compiler tries to lower to a Python function of the frame, and the
+# literals such an expression may contain
+_LOWERABLE_ROOTS = frozenset({BinOp, UnaryOp, TernaryOp})
+_LOWERABLE_LITERALS = frozenset({IntLit, FloatLit, StringLit, CharLit, BoolLit})
+
+# Opcode for a statement that only increments or decrements a local
+_INCREMENT_STEPS = {
+    _OP_PRE_INC: Opcode.INCR_LOCAL, _OP_POST_INC: Opcode.INCR_LOCAL,
+    _OP_PRE_DEC: Opcode.DECR_LOCAL, _OP_POST_DEC: Opcode.DECR_LOCAL,
+}
+
+# Expressions whose value is never a string, whatever their operands hold
+_NON_STRING_NODES = frozenset({IntLit, FloatLit, BoolLit, NullLit, UnaryOp,
+                               NewObject, NewArray, ArrayInit})
+
+def _is_non_string(expr: Expr, names: frozenset) -> bool:
+    """Whether expr can never evaluate to a string, given that the locals in names never
+    hold one. Only + can then skip its concatenation check."""
+    expr_type = type(expr)
+    if expr_type is Variable:
+        return expr.name in names
+    if expr_type in _NON_STRING_NODES:
+        # ! gives a bool; -, ++ and -- on a string raise
+        return True
+    if expr_type is BinOp:
+        op = expr.op
+        if op == _OP_ADD or op == _OP_MUL or op == _OP_AND or op == _OP_OR:
+            # Concatenation, repetition, or one of the operands themselves
+            return _is_non_string(expr.left, names) and _is_non_string(expr.right, names)
+        if op == _OP_MOD:
+            return _is_non_string(expr.left, names)  # "%s" % x formats
+        return True
+    if expr_type is TernaryOp:
+        return _is_non_string(expr.true_expr, names) and _is_non_string(expr.false_expr, names)
+    if expr_type is Cast:
+        convert = _cast_function(expr.target_type)
+        if convert is None:
+            return _is_non_string(expr.expr, names)
+        return convert is not str
+    return False
+
+def _non_string_locals(params: Dict[str, int], body: List[Stmt]) -> frozenset:
+    """Locals of a method body that no assignment can make a string (parameters excluded)
+
+    Walks the body in the order the compiler resolves names (a while or for condition
+    sees only the locals declared before the loop, although its test is emitted after
+    the body), so a name used before its declaration, which the compiler resolves to a
+    field there, is left out."""
+    declared = set(params)
+    early = set()  # names used before they are declared
+    stores = []  # [(name, stored expression or None if it may be a string), ...]
+
+    def read(expr):
+        pending = [expr]
+        while pending:
+            expr = pending.pop()
+            expr_type = type(expr)
+            if expr_type is Variable:
+                if expr.name not in declared:
+                    early.add(expr.name)
+            elif expr_type is BinOp:
+                pending += (expr.left, expr.right)
+            elif expr_type is UnaryOp:
+                pending.append(expr.operand)
+            elif expr_type is TernaryOp:
+                pending += (expr.condition, expr.true_expr, expr.false_expr)
+            elif expr_type is Cast:
+                pending.append(expr.expr)
+            elif expr_type is ArrayAccess:
+                pending += (expr.array, expr.index)
+            elif expr_type is FieldAccess:
+                pending.append(expr.obj)
+            elif expr_type is MethodCall:
+                if expr.obj is not None:
+                    pending.append(expr.obj)
+                pending += expr.args
+            elif expr_type is NewObject:
+                pending += expr.args
+            elif expr_type is NewArray:
+                pending += expr.sizes
+            elif expr_type is ArrayInit:
+                pending += expr.elements
+
+    def write(name, value):
+        if name not in declared:
+            early.add(name)
+        stores.append((name, value))
+
+    def declare(name, value):
+        declared.add(name)
+        stores.append((name, value))
+
+    def visit(stmts):
+        for stmt in stmts:
+            stmt_type = type(stmt)
+            if stmt_type is VarDecl:
+                if stmt.value is not None:
+                    read(stmt.value)
+                    declare(stmt.name, stmt.value)
+                else:
+                    default = Evaluator.get_default_value(stmt.var_type)
+                    declare(stmt.name, None if isinstance(default, str) else _NULL_LIT)
+            elif stmt_type is Assign:
+                read(stmt.value)
+                write(stmt.target, stmt.value)
+            elif stmt_type is CompoundAssign:
+                read(stmt.value)
+                # x -= v never yields a string; += concatenates like x + v
+                write(stmt.target, _NULL_LIT if stmt.op == _OP_SUB
+                      else BinOp(_OP_ADD, Variable(stmt.target), stmt.value))
+            elif stmt_type is ArrayAssign:
+                read(Variable(stmt.array))
+                read(stmt.index)
+                read(stmt.value)
+            elif stmt_type is FieldAssign:
+                read(stmt.obj)
+                read(stmt.value)
+            elif stmt_type is If:
+                read(stmt.condition)
+                visit(stmt.then_block)
+                visit(stmt.else_block or ())
+            elif stmt_type is While:
+                read(stmt.condition)
+                visit(stmt.body)
+            elif stmt_type is DoWhile:
+                visit(stmt.body)
+                read(stmt.condition)
+            elif stmt_type is For:
+                if stmt.init:
+                    visit((stmt.init,))
+                if stmt.condition:
+                    read(stmt.condition)
+                visit(stmt.body)
+                if stmt.update:
+                    visit((stmt.update,))
+            elif stmt_type is ForEach:
+                read(stmt.iterable)
+                declare(stmt.var, None)
+                visit(stmt.body)
+            elif stmt_type is Switch:
+                read(stmt.expr)
+                for value, _ in stmt.cases:
+                    read(value)
+                for _, case_stmts in stmt.cases:
+                    visit(case_stmts)
+                visit(stmt.default or ())
+            elif stmt_type is Return:
+                if stmt.expr is not None:
+                    read(stmt.expr)
+            elif stmt_type is ExprStmt:
+                read(stmt.expr)
+            elif stmt_type is Try:
+                visit(stmt.try_block)
+                for _, var, catch_stmts in stmt.catch_blocks:
+                    declare(var, None)  # the message string
+                    visit(catch_stmts)
+                visit(stmt.finally_block or ())
+
+    visit(body)
+    # Drop names until every remaining store is known not to be a string
+    names = declared - set(params) - early
+    changed = True
+    while changed:
+        changed = False
+        for name, value in stores:
+            if name in names and (value is None or not _is_non_string(value, names)):
+                names.discard(name)
+                changed = True
+    return frozenset(names)
+
+# Compiler method for each statement node type
+_STMT_COMPILERS = {
+    VarDecl: Compiler.compile_var_decl, Assign: Compiler.compile_assign,
+    CompoundAssign: Compiler.compile_compound_assign,
+    ArrayAssign: Compiler.compile_array_assign, FieldAssign: Compiler.compile_field_assign,
+    If: Compiler.compile_if, While: Compiler.compile_while, DoWhile: Compiler.compile_do_while,
+    For: Compiler.compile_for, ForEach: Compiler.compile_for_each,
+    Switch: Compiler.compile_switch, Break: Compiler.compile_break,
+    Continue: Compiler.compile_continue, Return: Compiler.compile_return,
+    ExprStmt: Compiler.compile_expr_stmt, Try: Compiler.compile_try,
+}
+
+# Compiler method for each expression node type
+_EXPR_COMPILERS = {
+    IntLit: Compiler.compile_literal, FloatLit: Compiler.compile_literal,
+    StringLit: Compiler.compile_literal, CharLit: Compiler.compile_literal,
+    BoolLit: Compiler.compile_literal, NullLit: Compiler.compile_null_lit,
+    Variable: Compiler.compile_variable, BinOp: Compiler.compile_bin_op,
+    UnaryOp: Compiler.compile_unary_op, TernaryOp: Compiler.compile_ternary_op,
+    Cast: Compiler.compile_cast, NewArray: Compiler.compile_new_array,
+    ArrayInit: Compiler.compile_array_init, ArrayAccess: Compiler.compile_array_access,
+    FieldAccess: Compiler.compile_field_access, NewObject: Compiler.compile_new_object,
+    MethodCall: Compiler.compile_method_call,
+}
+
+def _divide(left, right):
+    if right == 0:
+        raise RuntimeError("Division by zero")
+    return left / right
+
+def _cast_function(target_type: str):
+    """Conversion a cast to target_type applies, or None if it leaves the value as is"""
+    if 'int' in target_type:
+        return int
+    if 'float' in target_type or 'double' in target_type:
+        return float
+    if 'String' in target_type:
+        return str
+    return None
+
+# Function behind each binary operator except + (BINARY_ADD) and the short-circuit ones
+_BINARY_FUNCS = {
+    _OP_SUB: operator.sub, _OP_MUL: operator.mul,
+    _OP_DIV: _divide, _OP_MOD: operator.mod,
+    _OP_EQ: operator.eq, _OP_NE: operator.ne,
+    _OP_LT: operator.lt, _OP_LE: operator.le,
+    _OP_GT: operator.gt, _OP_GE: operator.ge,
+}
+
+_MATH_FUNCS = {
+    'abs': abs, 'sqrt': math.sqrt, 'pow': pow,
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'floor': math.floor, 'ceil': math.ceil,
+    'max': max, 'min': min,
+}
+
+# String methods, called with the string as the first argument
+_STRING_METHODS = {
+    'length': lambda s: len(s),
+    'substring': lambda s, start, end=None: s[start:end] if end else s[start:],
+    'toUpperCase': lambda s: s.upper(),
+    'toLowerCase': lambda s: s.lower(),
+    'charAt': lambda s, i: s[i],
+    'indexOf': lambda s, sub: s.find(sub),
+    'replace': lambda s, old, new: s.replace(old, new),
+}
+
 # ===========================
 # EVALUATOR
 # ===========================
 
 class JavaObject:
-    def __init__(self, class_name: str, fields: Dict[str, Any]):
+    """An instance: field values in a list, positioned by field_index. Objects of a class
+    share the class's field_index until a field the class does not declare is assigned,
+    which gives the object its own copy."""
+    __slots__ = ('class_name', 'field_index', 'values')
+
+    def __init__(self, class_name: str, field_index: Dict[str, int], values: List[Any]):
         self.class_name = class_name
-        self.fields = fields
+        self.field_index = field_index
+        self.values = values
+
+    def add_field(self, name: str, value: Any):
+        self.field_index = {**self.field_index, name: len(self.values)}
+        self.values.append(value)
 
 class Evaluator:
     def __init__(self):
         self.global_env: Dict[str, Any] = {}
-        self.env_stack: List[Dict[str, Any]] = [self.global_env]
+        self.frame: List[Any] = []  # locals of the running method, indexed by slot
         self.classes: Dict[str, ClassDecl] = {}
         self.methods: Dict[str, MethodDecl] = {}
         self.current_object = None
-    
-    def current_env(self):
-        return self.env_stack[-1]
-    
-    def push_env(self, env: Dict[str, Any] = None):
-        self.env_stack.append(env if env else {})
-    
-    def pop_env(self):
-        if len(self.env_stack) > 1:
-            self.env_stack.pop()
-    
+        self.return_value = None  # set when a try block's code ends by return
+
     def get_var(self, name: str):
-        # First check local/parameter variables
-        for env in reversed(self.env_stack):
-            if name in env:
-                return env[name]
-        
+        """Look up a name that is not a local of the running method"""
+        # First check program-level variables
+        if name in self.global_env:
+            return self.global_env[name]
+
         # Then check current object's fields
-        if self.current_object and isinstance(self.current_object, JavaObject):
-            if name in self.current_object.fields:
-                return self.current_object.fields[name]
-        
+        obj = self.current_object
+        if isinstance(obj, JavaObject):
+            slot = obj.field_index.get(name)
+            if slot is not None:
+                return obj.values[slot]
+
         raise NameError(f"Variable '{name}' is not defined")
-    
+
     def set_var(self, name: str, value: Any):
-        # Check if variable exists in any scope
-        for env in reversed(self.env_stack):
-            if name in env:
-                env[name] = value
-                return
-        
         # Check if it's a field of the current object
-        if self.current_object and isinstance(self.current_object, JavaObject):
-            if name in self.current_object.fields:
-                self.current_object.fields[name] = value
+        obj = self.current_object
+        if name not in self.global_env and isinstance(obj, JavaObject):
+            slot = obj.field_index.get(name)
+            if slot is not None:
+                obj.values[slot] = value
                 return
-        
-        # Otherwise create new variable in current scope
-        self.current_env()[name] = value
-    
-    def eval_expr(self, expr: Expr) -> Any:
-        
-        if isinstance(expr, IntLit):
-            return expr.value
-        
-        if isinstance(expr, FloatLit):
-            return expr.value
-        
-        if isinstance(expr, StringLit):
-            return expr.value
-        
-        if isinstance(expr, CharLit):
-            return expr.value
-        
-        if isinstance(expr, BoolLit):
-            return expr.value
-        
-        if isinstance(expr, NullLit):
-            return None
-        
-        if isinstance(expr, Variable):
-            if expr.name == 'this':
-                return self.current_object
-            return self.get_var(expr.name)
-        
-        if isinstance(expr, BinOp):
-            left = self.eval_expr(expr.left)
-            
-            # Short-circuit evaluation
-            if expr.op == '&&':
-                return left and self.eval_expr(expr.right)
-            if expr.op == '||':
-                return left or self.eval_expr(expr.right)
-            
-            right = self.eval_expr(expr.right)
-            
-            # Special handling for + operator (addition or string concatenation)
-            if expr.op == '+':
-                # If either operand is a string, convert both to strings and concatenate
-                if isinstance(left, str) or isinstance(right, str):
-                    return str(left) + str(right)
-                else:
-                    return left + right
-            
-            ops = {
-                '-': lambda l, r: l - r,
-                '*': lambda l, r: l * r,
-                '/': lambda l, r: l / r if r != 0 else self.error("Division by zero"),
-                '%': lambda l, r: l % r,
-                '==': lambda l, r: l == r,
-                '!=': lambda l, r: l != r,
-                '<': lambda l, r: l < r,
-                '<=': lambda l, r: l <= r,
-                '>': lambda l, r: l > r,
-                '>=': lambda l, r: l >= r,
-            }
-            
-            if expr.op in ops:
-                return ops[expr.op](left, right)
-        
-        if isinstance(expr, UnaryOp):
-            if expr.op == '!':
-                return not self.eval_expr(expr.operand)
-            elif expr.op == '-':
-                return -self.eval_expr(expr.operand)
-            elif expr.op == '++pre':
-                var = expr.operand
-                if isinstance(var, Variable):
-                    val = self.get_var(var.name) + 1
-                    self.set_var(var.name, val)
-                    return val
-            elif expr.op == '--pre':
-                var = expr.operand
-                if isinstance(var, Variable):
-                    val = self.get_var(var.name) - 1
-                    self.set_var(var.name, val)
-                    return val
-            elif expr.op == '++post':
-                var = expr.operand
-                if isinstance(var, Variable):
-                    old = self.get_var(var.name)
-                    self.set_var(var.name, old + 1)
-                    return old
-            elif expr.op == '--post':
-                var = expr.operand
-                if isinstance(var, Variable):
-                    old = self.get_var(var.name)
-                    self.set_var(var.name, old - 1)
-                    return old
-        
-        if isinstance(expr, TernaryOp):
-            cond = self.eval_expr(expr.condition)
-            return self.eval_expr(expr.true_expr) if cond else self.eval_expr(expr.false_expr)
-        
-        if isinstance(expr, Cast):
-            value = self.eval_expr(expr.expr)
-            if 'int' in expr.target_type:
-                return int(value)
-            elif 'float' in expr.target_type or 'double' in expr.target_type:
-                return float(value)
-            elif 'String' in expr.target_type:
-                return str(value)
-            return value
-        
-        if isinstance(expr, NewArray):
-            if expr.sizes:
-                size = self.eval_expr(expr.sizes[0])
-                return [0] * size if 'int' in expr.element_type else [None] * size
-            return []
-        
-        if isinstance(expr, ArrayInit):
-            return [self.eval_expr(e) for e in expr.elements]
-        
-        if isinstance(expr, ArrayAccess):
-            array = self.eval_expr(expr.array)
-            index = self.eval_expr(expr.index)
-            return array[index]
-        
-        if isinstance(expr, FieldAccess):
-            obj = self.eval_expr(expr.obj)
-            if isinstance(obj, JavaObject):
-                return obj.fields.get(expr.field)
-            elif isinstance(obj, list) and expr.field == 'length':
-                return len(obj)
-            elif isinstance(obj, str) and expr.field == 'length':
-                return len(obj)
-        
-        if isinstance(expr, NewObject):
-            class_decl = self.classes.get(expr.class_name)
-            if class_decl:
-                fields = {}
-                for field in class_decl.fields:
-                    fields[field.name] = self.eval_expr(field.value) if field.value else None
-                
-                obj = JavaObject(expr.class_name, fields)
-                
-                # Run constructor
-                for constructor in class_decl.constructors:
-                    if len(constructor.params) == len(expr.args):
-                        self.push_env()
-                        old_obj = self.current_object
-                        self.current_object = obj
-                        
-                        for (param_type, param_name), arg in zip(constructor.params, expr.args):
-                            self.set_var(param_name, self.eval_expr(arg))
-                        
-                        for stmt in constructor.body:
-                            self.eval_stmt(stmt)
-                        
-                        self.current_object = old_obj
-                        self.pop_env()
-                        break
-                
-                return obj
-        
-        if isinstance(expr, MethodCall):
-            args = [self.eval_expr(arg) for arg in expr.args]
-            
-            # Built-in methods
-            if expr.method in ('println', 'print'):
-                if args:
-                    print(args[0], end='\n' if expr.method == 'println' else '')
-                else:
-                    print()
-                return None
-            
-            # Math methods
-            if expr.obj and isinstance(expr.obj, Variable) and expr.obj.name == 'Math':
-                math_funcs = {
-                    'abs': abs, 'sqrt': math.sqrt, 'pow': pow,
-                    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-                    'floor': math.floor, 'ceil': math.ceil,
-                    'max': max, 'min': min,
-                }
-                if expr.method in math_funcs:
-                    return math_funcs[expr.method](*args)
-            
-            # String methods
-            if expr.obj:
-                obj = self.eval_expr(expr.obj)
-                if isinstance(obj, str):
-                    string_methods = {
-                        'length': lambda: len(obj),
-                        'substring': lambda start, end=None: obj[start:end] if end else obj[start:],
-                        'toUpperCase': lambda: obj.upper(),
-                        'toLowerCase': lambda: obj.lower(),
-                        'charAt': lambda i: obj[i],
-                        'indexOf': lambda s: obj.find(s),
-                        'replace': lambda old, new: obj.replace(old, new),
-                    }
-                    if expr.method in string_methods:
-                        return string_methods[expr.method](*args)
-                
-                # Object methods
-                if isinstance(obj, JavaObject):
-                    class_decl = self.classes.get(obj.class_name)
-                    for method in class_decl.methods:
-                        if method.name == expr.method and len(method.params) == len(args):
-                            self.push_env()
-                            old_obj = self.current_object
-                            self.current_object = obj
-                            
-                            for (param_type, param_name), arg_val in zip(method.params, args):
-                                self.set_var(param_name, arg_val)
-                            
-                            try:
-                                for stmt in method.body:
-                                    self.eval_stmt(stmt)
-                                result = None
-                            except ReturnException as e:
-                                result = e.value
-                            
-                            self.current_object = old_obj
-                            self.pop_env()
-                            return result
-            
-            # Global methods
-            if expr.method in self.methods:
-                method = self.methods[expr.method]
-                if len(method.params) == len(args):
-                    self.push_env()
-                    
-                    for (param_type, param_name), arg_val in zip(method.params, args):
-                        self.set_var(param_name, arg_val)
-                    
-                    try:
-                        for stmt in method.body:
-                            self.eval_stmt(stmt)
-                        result = None
-                    except ReturnException as e:
-                        result = e.value
-                    
-                    self.pop_env()
-                    return result
-        
+
+        # Otherwise it is a program-level variable
+        self.global_env[name] = value
+
+    def run(self, code: Code) -> Any:
+        """Execute code until RETURN_VALUE and return the value it left on the stack"""
+        instructions = code.threaded
+        stack = []
+        pc = 0
+        while True:
+            try:
+                while pc >= 0:
+                    handler, arg = instructions[pc]
+                    pc = handler(self, stack, arg, pc + 1)
+                return stack[-1]
+            except (BreakException, ContinueException) as e:
+                pc = code.escape(e, pc, stack)
+
+    def invoke(self, method: Union[MethodDecl, Constructor], args: List[Any],
+               obj: Optional[JavaObject] = None) -> Any:
+        """Call method with already evaluated args, as a method of obj when one is given.
+        The args list itself becomes the callee's frame."""
+        code = method.code
+        if code is None:
+            code = method.code = Compiler.compile_method(method)
+        frame = args
+        frame += code.padding
+
+        old_frame = self.frame
+        old_obj = self.current_object
+        self.frame = frame
+        if obj is not None:
+            self.current_object = obj
+        try:
+            return self.run(code)
+        finally:
+            self.frame = old_frame
+            self.current_object = old_obj
+
+    def call_global(self, name: str, args: List[Any]) -> Any:
+        method = self.methods.get(name)
+        if method is not None and len(method.params) == len(args):
+            return self.invoke(method, args)
         return None
-    
-    def error(self, msg: str):
-        raise RuntimeError(msg)
-    
-    def eval_stmt(self, stmt: Stmt):
-        if isinstance(stmt, VarDecl):
-            value = self.eval_expr(stmt.value) if stmt.value else self.get_default_value(stmt.var_type)
-            self.set_var(stmt.name, value)
-        
-        elif isinstance(stmt, Assign):
-            value = self.eval_expr(stmt.value)
-            self.set_var(stmt.target, value)
-        
-        elif isinstance(stmt, ArrayAssign):
-            array = self.get_var(stmt.array)
-            index = self.eval_expr(stmt.index)
-            value = self.eval_expr(stmt.value)
-            array[index] = value
-        
-        elif isinstance(stmt, FieldAssign):
-            obj = self.eval_expr(stmt.obj)
-            if isinstance(obj, JavaObject):
-                obj.fields[stmt.field] = self.eval_expr(stmt.value)
-        
-        elif isinstance(stmt, If):
-            if self.eval_expr(stmt.condition):
-                for s in stmt.then_block:
-                    self.eval_stmt(s)
+
+    # Instruction handlers: each takes the operand stack and the instruction's argument
+    # and returns the index of the next instruction to run (negative to stop)
+
+    def op_load_const(self, stack, value, pc):
+        stack.append(value)
+        return pc
+
+    def op_load_local(self, stack, slot, pc):
+        stack.append(self.frame[slot])
+        return pc
+
+    def op_load_name(self, stack, name, pc):
+        stack.append(self.get_var(name))
+        return pc
+
+    def op_load_this(self, stack, _, pc):
+        stack.append(self.current_object)
+        return pc
+
+    def op_store_local(self, stack, slot, pc):
+        self.frame[slot] = stack.pop()
+        return pc
+
+    def op_store_name(self, stack, name, pc):
+        self.set_var(name, stack.pop())
+        return pc
+
+    def op_pop_top(self, stack, _, pc):
+        stack.pop()
+        return pc
+
+    def op_py_expr(self, stack, func, pc):
+        stack.append(func(self.frame))
+        return pc
+
+    def op_py_jump_if_false(self, stack, arg, pc):
+        func, target = arg
+        return pc if func(self.frame) else target
+
+    def op_py_jump_if_true(self, stack, arg, pc):
+        func, target = arg
+        return target if func(self.frame) else pc
+
+    def op_binary_add(self, stack, _, pc):
+        right = stack.pop()
+        left = stack[-1]
+        # If either operand is a string, convert both to strings and concatenate
+        # (every string value here is a plain str, so an identity check on its type will do)
+        left_type, right_type = type(left), type(right)
+        if left_type is str:
+            stack[-1] = left + (right if right_type is str else str(right))
+        elif right_type is str:
+            stack[-1] = str(left) + right
+        else:
+            stack[-1] = left + right
+        return pc
+
+    def op_binary_op(self, stack, func, pc):
+        right = stack.pop()
+        stack[-1] = func(stack[-1], right)
+        return pc
+
+    def op_unary_not(self, stack, _, pc):
+        stack[-1] = not stack[-1]
+        return pc
+
+    def op_unary_neg(self, stack, _, pc):
+        stack[-1] = -stack[-1]
+        return pc
+
+    def op_increment_local(self, stack, arg, pc):
+        slot, increment, post = arg
+        frame = self.frame
+        old = frame[slot]
+        new = frame[slot] = old + 1 if increment else old - 1
+        stack.append(old if post else new)
+        return pc
+
+    def op_incr_local(self, stack, slot, pc):
+        frame = self.frame
+        frame[slot] = frame[slot] + 1
+        return pc
+
+    def op_decr_local(self, stack, slot, pc):
+        frame = self.frame
+        frame[slot] = frame[slot] - 1
+        return pc
+
+    def op_increment(self, stack, arg, pc):
+        name, increment, post = arg
+        old = self.get_var(name)
+        new = old + 1 if increment else old - 1
+        self.set_var(name, new)
+        stack.append(old if post else new)
+        return pc
+
+    def op_cast(self, stack, convert, pc):
+        stack[-1] = convert(stack[-1])
+        return pc
+
+    def op_build_list(self, stack, count, pc):
+        if count:
+            elements = stack[-count:]
+            del stack[-count:]
+        else:
+            elements = []
+        stack.append(elements)
+        return pc
+
+    def op_new_array(self, stack, element_type, pc):
+        size = stack[-1]
+        stack[-1] = [0] * size if 'int' in element_type else [None] * size
+        return pc
+
+    def op_binary_subscr(self, stack, _, pc):
+        index = stack.pop()
+        stack[-1] = stack[-1][index]
+        return pc
+
+    def op_store_subscr(self, stack, _, pc):
+        value = stack.pop()
+        index = stack.pop()
+        array = stack.pop()
+        array[index] = value
+        return pc
+
+    def op_load_field(self, stack, cache, pc):
+        name, cached_index, cached_slot = cache
+        obj = stack[-1]
+        if isinstance(obj, JavaObject):
+            field_index = obj.field_index
+            if field_index is cached_index:
+                stack[-1] = obj.values[cached_slot]
+                return pc
+            slot = field_index.get(name)
+            if slot is None:
+                stack[-1] = None
             else:
-                for s in stmt.else_block:
-                    self.eval_stmt(s)
-        
-        elif isinstance(stmt, While):
-            while self.eval_expr(stmt.condition):
-                try:
-                    for s in stmt.body:
-                        self.eval_stmt(s)
-                except BreakException:
-                    break
-                except ContinueException:
-                    continue
-        
-        elif isinstance(stmt, DoWhile):
-            while True:
-                try:
-                    for s in stmt.body:
-                        self.eval_stmt(s)
-                except BreakException:
-                    break
-                except ContinueException:
-                    pass
-                
-                if not self.eval_expr(stmt.condition):
-                    break
-        
-        elif isinstance(stmt, For):
-            if stmt.init:
-                self.eval_stmt(stmt.init)
-            
-            while True:
-                if stmt.condition and not self.eval_expr(stmt.condition):
-                    break
-                
-                try:
-                    for s in stmt.body:
-                        self.eval_stmt(s)
-                except BreakException:
-                    break
-                except ContinueException:
-                    pass
-                
-                if stmt.update:
-                    self.eval_stmt(stmt.update)
-        
-        elif isinstance(stmt, ForEach):
-            iterable = self.eval_expr(stmt.iterable)
-            for item in iterable:
-                self.set_var(stmt.var, item)
-                try:
-                    for s in stmt.body:
-                        self.eval_stmt(s)
-                except BreakException:
-                    break
-                except ContinueException:
-                    continue
-        
-        elif isinstance(stmt, Switch):
-            value = self.eval_expr(stmt.expr)
-            matched = False
-            
-            for case_val, case_stmts in stmt.cases:
-                case_result = self.eval_expr(case_val)
-                if value == case_result or matched:
-                    matched = True
-                    try:
-                        for s in case_stmts:
-                            self.eval_stmt(s)
-                    except BreakException:
-                        break
-            
-            if not matched and stmt.default:
-                for s in stmt.default:
-                    self.eval_stmt(s)
-        
-        elif isinstance(stmt, Break):
-            raise BreakException()
-        
-        elif isinstance(stmt, Continue):
-            raise ContinueException()
-        
-        elif isinstance(stmt, Return):
-            value = self.eval_expr(stmt.expr) if stmt.expr else None
-            raise ReturnException(value)
-        
-        elif isinstance(stmt, ExprStmt):
-            self.eval_expr(stmt.expr)
-        
-        elif isinstance(stmt, Try):
-            try:
-                for s in stmt.try_block:
-                    self.eval_stmt(s)
-            except Exception as e:
-                for exception_type, var, catch_body in stmt.catch_blocks:
-                    self.push_env()
+                cache[1] = field_index
+                cache[2] = slot
+                stack[-1] = obj.values[slot]
+        elif isinstance(obj, (list, str)) and name == 'length':
+            stack[-1] = len(obj)
+        else:
+            stack[-1] = None
+        return pc
+
+    def op_store_field(self, stack, cache, pc):
+        name, cached_index, cached_slot = cache
+        value = stack.pop()
+        obj = stack.pop()
+        field_index = obj.field_index
+        if field_index is cached_index:
+            obj.values[cached_slot] = value
+            return pc
+        slot = field_index.get(name)
+        if slot is None:
+            obj.add_field(name, value)
+        else:
+            cache[1] = field_index
+            cache[2] = slot
+            obj.values[slot] = value
+        return pc
+
+    def op_new_object(self, stack, arg, pc):
+        class_name, nargs = arg
+        args = stack[len(stack) - nargs:]
+        del stack[len(stack) - nargs:]
+        class_decl = self.classes.get(class_name)
+        if not class_decl:
+            stack.append(None)
+            return pc
+
+        field_index = class_decl.field_index
+        values = self.run(class_decl.init_code)
+        if len(values) != len(field_index):
+            # A field declared twice: its slot gets the last declaration's value
+            slot_values = [None] * len(field_index)
+            for field_decl, value in zip(class_decl.fields, values):
+                slot_values[field_index[field_decl.name]] = value
+            values = slot_values
+
+        obj = JavaObject(class_decl.name, field_index, values)
+
+        # Run constructor
+        constructor = class_decl.constructor_index.get(nargs)
+        if constructor is not None:
+            self.invoke(constructor, args, obj)
+
+        stack.append(obj)
+        return pc
+
+    def op_call_print(self, stack, arg, pc):
+        newline, nargs = arg
+        if nargs:
+            value = stack[-nargs]
+            del stack[-nargs:]
+            print(value, end='\n' if newline else '')
+        else:
+            print()
+        stack.append(None)
+        return pc
+
+    def op_call_math(self, stack, arg, pc):
+        func, nargs = arg
+        args = stack[len(stack) - nargs:]
+        del stack[len(stack) - nargs:]
+        stack.append(func(*args))
+        return pc
+
+    def op_call_method(self, stack, cache, pc):
+        name, nargs, string_method, cached_class, cached_method = cache
+        obj = stack.pop()
+        args = stack[len(stack) - nargs:]
+        del stack[len(stack) - nargs:]
+
+        # String methods
+        if string_method is not None and isinstance(obj, str):
+            stack.append(string_method(obj, *args))
+            return pc
+
+        # Object methods, remembering the method found for the last class seen here
+        if isinstance(obj, JavaObject):
+            if obj.class_name is cached_class:
+                method = cached_method
+            else:
+                method = self.classes[obj.class_name].method_index.get((name, nargs))
+                cache[3] = obj.class_name
+                cache[4] = method
+            if method is not None:
+                stack.append(self.invoke(method, args, obj))
+                return pc
+
+        stack.append(self.call_global(name, args))
+        return pc
+
+    def op_call_global(self, stack, arg, pc):
+        name, nargs = arg
+        args = stack[len(stack) - nargs:]
+        del stack[len(stack) - nargs:]
+        stack.append(self.call_global(name, args))
+        return pc
+
+    def op_jump(self, stack, target, pc):
+        return target
+
+    def op_jump_if_false(self, stack, target, pc):
+        return pc if stack.pop() else target
+
+    def op_jump_if_true(self, stack, target, pc):
+        return target if stack.pop() else pc
+
+    def op_jump_if_false_or_pop(self, stack, target, pc):
+        if not stack[-1]:
+            return target
+        stack.pop()
+        return pc
+
+    def op_jump_if_true_or_pop(self, stack, target, pc):
+        if stack[-1]:
+            return target
+        stack.pop()
+        return pc
+
+    def op_jump_if_not_object(self, stack, target, pc):
+        if isinstance(stack[-1], JavaObject):
+            return pc
+        stack.pop()
+        return target
+
+    def op_case_jump(self, stack, target, pc):
+        """Pop a case label; if it equals the switch value beneath it, pop that and jump"""
+        label = stack.pop()
+        if stack[-1] == label:
+            stack.pop()
+            return target
+        return pc
+
+    def op_switch(self, stack, arg, pc):
+        """Pop the switch value and jump to the case labelled with it, else to default"""
+        table, default = arg
+        try:
+            return table.get(stack.pop(), default)
+        except TypeError:  # an unhashable value (an array) equals no label
+            return default
+
+    def op_get_iter(self, stack, _, pc):
+        stack[-1] = iter(stack[-1])
+        return pc
+
+    def op_for_iter(self, stack, target, pc):
+        for item in stack[-1]:
+            stack.append(item)
+            return pc
+        stack.pop()
+        return target
+
+    def op_for_iter_local(self, stack, arg, pc):
+        slot, target = arg
+        for item in stack[-1]:
+            self.frame[slot] = item
+            return pc
+        stack.pop()
+        return target
+
+    def op_try(self, stack, arg, pc):
+        try_code, catches, finally_code, exits = arg
+        error = None
+        try:
+            exit_value = self.run(try_code)
+        except Exception as e:
+            exit_value = None
+            for var, slot, catch_code in catches:
+                if slot is None:
                     self.set_var(var, str(e))
-                    for s in catch_body:
-                        self.eval_stmt(s)
-                    self.pop_env()
-                    break
-            finally:
-                if stmt.finally_block:
-                    for s in stmt.finally_block:
-                        self.eval_stmt(s)
-    
-    def get_default_value(self, type_str: str):
+                else:
+                    self.frame[slot] = str(e)
+                try:
+                    exit_value = self.run(catch_code)
+                except Exception as catch_error:
+                    error = catch_error
+                break
+        value = self.return_value if exit_value is _EXIT_RETURN else None
+
+        if finally_code is not None:
+            finally_exit = self.run(finally_code)
+            # Leaving finally by break, continue or return overrides how the try ended
+            if finally_exit is not None:
+                exit_value, value, error = finally_exit, self.return_value, None
+        if error is not None:
+            raise error
+
+        if exit_value is None:
+            return pc
+        if exit_value is _EXIT_RETURN:
+            stack.append(value)
+        return exits[exit_value]
+
+    def op_return_value(self, stack, _, pc):
+        return -1
+
+    def op_block_return(self, stack, _, pc):
+        self.return_value = stack.pop()
+        stack.append(_EXIT_RETURN)
+        return -1
+
+    def op_raise_return(self, stack, _, pc):
+        raise ReturnException(stack.pop())
+
+    def op_raise_break(self, stack, _, pc):
+        raise BreakException()
+
+    def op_raise_continue(self, stack, _, pc):
+        raise ContinueException()
+
+    @staticmethod
+    def get_default_value(type_str: str):
         if 'int' in type_str:
             return 0
         elif 'float' in type_str or 'double' in type_str:
@@ -1778,45 +2910,61 @@ class Evaluator:
         elif '[]' in type_str:
             return []
         return None
-    
+
     def eval_program(self, classes: List[ClassDecl], stmts: List[Stmt]):
         # Register classes
         for class_decl in classes:
             self.classes[class_decl.name] = class_decl
-            
+
+            class_decl.method_index = {}
+            for method in class_decl.methods:
+                class_decl.method_index.setdefault((method.name, len(method.params)), method)
+            class_decl.constructor_index = {}
+            for constructor in class_decl.constructors:
+                class_decl.constructor_index.setdefault(len(constructor.params), constructor)
+            class_decl.field_index = {}
+            for field_decl in class_decl.fields:
+                class_decl.field_index.setdefault(field_decl.name, len(class_decl.field_index))
+            if class_decl.init_code is None:
+                class_decl.init_code = Compiler().compile_field_values(class_decl.fields)
+
             # Register static methods
             for method in class_decl.methods:
                 if 'static' in method.modifiers:
                     self.methods[method.name] = method
-        
+
         # Find and run main method
         for class_decl in classes:
             for method in class_decl.methods:
                 if method.name == 'main' and 'static' in method.modifiers:
-                    self.push_env()
-                    try:
-                        for stmt in method.body:
-                            self.eval_stmt(stmt)
-                    except ReturnException:
-                        pass
-                    self.pop_env()
+                    self.invoke(method, [None] * len(method.params))
                     return
-        
+
         # No main found, execute statements directly
-        for stmt in stmts:
-            self.eval_stmt(stmt)
+        self.run(Compiler().compile_body(stmts))
+
+# Instruction handlers indexed by opcode
+_HANDLERS = [None] * (len(Opcode) + 1)
+for _opcode in Opcode:
+    _HANDLERS[_opcode] = getattr(Evaluator, 'op_' + _opcode.name.lower())
 
 # ===========================
 # MAIN
 # ===========================
 
+@functools.lru_cache(maxsize=32)
+def parse_program(code: str) -> tuple:
+    """Classes and top-level statements of a program, reused when the same source is
+    interpreted again (method bodies and their compiled code included)"""
+    lexer = Lexer(code)
+    tokens = lexer.tokenize()
+    
+    parser = Parser(tokens, fold_constants=True)
+    return parser.parse_program()
+
 def interpret(code: str):
     try:
-        lexer = Lexer(code)
-        tokens = lexer.tokenize()
-        
-        parser = Parser(tokens)
-        classes, stmts = parser.parse_program()
+        classes, stmts = parse_program(code)
         
         evaluator = Evaluator()
         evaluator.eval_program(classes, stmts)
@@ -1829,85 +2977,154 @@ def interpret(code: str):
 
 
 
+def _ast_value(node, result):
+    result["value"] = node.value
+    return ()
+
+def _ast_variable(node, result):
+    result["name"] = node.name
+    return ()
+
+def _ast_bin_op(node, result):
+    result["operator"] = node.op
+    children = result["children"]
+    return ((node.left, children), (node.right, children))
+
+def _ast_method_call(node, result):
+    result["method"] = node.method
+    children = result["children"]
+    nodes = [(node.obj, children)] if node.obj else []
+    nodes += [(arg, children) for arg in node.args]
+    return nodes
+
+def _ast_var_decl(node, result):
+    result["varType"] = node.var_type
+    result["name"] = node.name
+    return ((node.value, result["children"]),) if node.value else ()
+
+def _ast_class_decl(node, result):
+    result["name"] = node.name
+    result["extends"] = node.extends if hasattr(node, 'extends') else None
+    children = result["children"]
+    return [(member, children) for member in node.fields] + [(member, children) for member in node.methods]
+
+def _ast_method_decl(node, result):
+    result["name"] = node.name
+    result["returnType"] = node.return_type
+    children = result["children"]
+    return [(stmt, children) for stmt in node.body]
+
+def _ast_section(section_type: str, nodes, result, pending):
+    """Add a {"type": section_type} grouping to result's children, its nodes to pending"""
+    children = []
+    result["children"].append({"type": section_type, "children": children})
+    pending += [(node, children) for node in nodes]
+
+def _ast_if(node, result):
+    pending = []
+    _ast_section("condition", (node.condition,), result, pending)
+    _ast_section("then", node.then_block, result, pending)
+    if node.else_block:
+        _ast_section("else", node.else_block, result, pending)
+    return pending
+
+def _ast_while(node, result):
+    pending = []
+    _ast_section("condition", (node.condition,), result, pending)
+    _ast_section("body", node.body, result, pending)
+    return pending
+
+def _ast_for(node, result):
+    pending = []
+    if node.init:
+        _ast_section("init", (node.init,), result, pending)
+    if node.condition:
+        _ast_section("condition", (node.condition,), result, pending)
+    if node.update:
+        _ast_section("update", (node.update,), result, pending)
+    _ast_section("body", node.body, result, pending)
+    return pending
+
+def _ast_assign(node, result):
+    result["target"] = node.target
+    return ((node.value, result["children"]),)
+
+def _ast_compound_assign(node, result):
+    # Shown as the equivalent plain assignment, x = x op value
+    result["type"] = "Assign"
+    result["target"] = node.target
+    return ((BinOp(node.op, Variable(node.target), node.value), result["children"]),)
+
+def _ast_return(node, result):
+    return ((node.expr, result["children"]),) if node.expr else ()
+
+def _ast_expr_stmt(node, result):
+    return ((node.expr, result["children"]),)
+
+def _ast_field_decl(node, result):
+    result["fieldType"] = node.field_type
+    result["name"] = node.name
+    return ((node.value, result["children"]),) if node.value else ()
+
+# Fills in the dictionary of each node type shown in the AST view, returning the
+# (child node, list its dictionary goes in) pairs still to convert, in order
+_AST_DICT_BUILDERS = {
+    IntLit: _ast_value, StringLit: _ast_value, Variable: _ast_variable,
+    BinOp: _ast_bin_op, MethodCall: _ast_method_call, VarDecl: _ast_var_decl,
+    ClassDecl: _ast_class_decl, MethodDecl: _ast_method_decl,
+    If: _ast_if, While: _ast_while, For: _ast_for,
+    Assign: _ast_assign, CompoundAssign: _ast_compound_assign,
+    Return: _ast_return, ExprStmt: _ast_expr_stmt, FieldDecl: _ast_field_decl,
+}
+
 def ast_to_dict(node, depth=0):
     """Convert AST node to dictionary for visualization"""
-    if depth > 20:  # Prevent infinite recursion
-        return {"type": "...", "children": []}
-    
-    result = {"type": type(node).__name__, "children": []}
-    
-    # Handle different node types
-    if isinstance(node, IntLit):
-        result["value"] = node.value
-    elif isinstance(node, StringLit):
-        result["value"] = node.value
-    elif isinstance(node, Variable):
-        result["name"] = node.name
-    elif isinstance(node, BinOp):
-        result["operator"] = node.op
-        result["children"] = [
-            ast_to_dict(node.left, depth+1),
-            ast_to_dict(node.right, depth+1)
-        ]
-    elif isinstance(node, MethodCall):
-        result["method"] = node.method
-        if node.obj:
-            result["children"].append(ast_to_dict(node.obj, depth+1))
-        for arg in node.args:
-            result["children"].append(ast_to_dict(arg, depth+1))
-    elif isinstance(node, VarDecl):
-        result["varType"] = node.var_type
-        result["name"] = node.name
-        if node.value:
-            result["children"] = [ast_to_dict(node.value, depth+1)]
-    elif isinstance(node, ClassDecl):
-        result["name"] = node.name
-        result["extends"] = node.extends if hasattr(node, 'extends') else None
-        for field in node.fields:
-            result["children"].append(ast_to_dict(field, depth+1))
-        for method in node.methods:
-            result["children"].append(ast_to_dict(method, depth+1))
-    elif isinstance(node, MethodDecl):
-        result["name"] = node.name
-        result["returnType"] = node.return_type
-        for stmt in node.body:
-            result["children"].append(ast_to_dict(stmt, depth+1))
-    elif isinstance(node, If):
-        result["children"] = [
-            {"type": "condition", "children": [ast_to_dict(node.condition, depth+1)]},
-            {"type": "then", "children": [ast_to_dict(s, depth+1) for s in node.then_block]},
-        ]
-        if node.else_block:
-            result["children"].append({"type": "else", "children": [ast_to_dict(s, depth+1) for s in node.else_block]})
-    elif isinstance(node, While):
-        result["children"] = [
-            {"type": "condition", "children": [ast_to_dict(node.condition, depth+1)]},
-            {"type": "body", "children": [ast_to_dict(s, depth+1) for s in node.body]}
-        ]
-    elif isinstance(node, For):
-        result["children"] = []
-        if node.init:
-            result["children"].append({"type": "init", "children": [ast_to_dict(node.init, depth+1)]})
-        if node.condition:
-            result["children"].append({"type": "condition", "children": [ast_to_dict(node.condition, depth+1)]})
-        if node.update:
-            result["children"].append({"type": "update", "children": [ast_to_dict(node.update, depth+1)]})
-        result["children"].append({"type": "body", "children": [ast_to_dict(s, depth+1) for s in node.body]})
-    elif isinstance(node, Assign):
-        result["target"] = node.target
-        result["children"] = [ast_to_dict(node.value, depth+1)]
-    elif isinstance(node, Return):
-        if node.expr:
-            result["children"] = [ast_to_dict(node.expr, depth+1)]
-    elif isinstance(node, ExprStmt):
-        result["children"] = [ast_to_dict(node.expr, depth+1)]
-    elif isinstance(node, FieldDecl):
-        result["fieldType"] = node.field_type
-        result["name"] = node.name
-        if node.value:
-            result["children"] = [ast_to_dict(node.value, depth+1)]
+    # Depth-first with an explicit stack, visiting nodes in the same order recursion
+    # would (a method body is parsed when it is reached, so errors surface in order)
+    top = []
+    pending = [(node, depth, top)]
+    while pending:
+        node, depth, siblings = pending.pop()
+        if depth > 20:  # Prevent infinite recursion
+            siblings.append({"type": "...", "children": []})
+            continue
+        
+        result = {"type": type(node).__name__, "children": []}
+        siblings.append(result)
+        build = _AST_DICT_BUILDERS.get(type(node))
+        if build is not None:
+            children = build(node, result)
+            depth += 1
+            for child, child_siblings in reversed(children):
+                pending.append((child, depth, child_siblings))
     
-    return result
+    return top[0]
+
+def _ast_json(node: dict, indent: str, parts: List[str]):
+    """Append the text json.dumps(node, indent=2) gives for an ast_to_dict result (nested
+    at indent) to parts. Node dictionaries only hold strings, numbers, None and lists of
+    nodes, so this skips the generic encoder, which is pure Python whenever indent is set."""
+    inner = indent + '  '
+    separator = '{\n' + inner
+    for key, value in node.items():
+        key = separator + _encode_json_string(key)
+        if type(value) is list:
+            if value:
+                item_indent = inner + '  '
+                parts.append(key + ': [\n' + item_indent)
+                _ast_json(value[0], item_indent, parts)
+                for item in value[1:]:
+                    parts.append(',\n' + item_indent)
+                    _ast_json(item, item_indent, parts)
+                parts.append('\n' + inner + ']')
+            else:
+                parts.append(key + ': []')
+        elif type(value) is str:
+            parts.append(key + ': ' + _encode_json_string(value))
+        else:
+            parts.append(key + ': ' + json.dumps(value))
+        separator = ',\n' + inner
+    parts.append('\n' + indent + '}')
 
 def parse_to_ast_json(code: str):
     """Parse code and return AST as JSON"""
@@ -1930,15 +3147,15 @@ def parse_to_ast_json(code: str):
         for stmt in stmts:
             ast_tree["children"].append(ast_to_dict(stmt))
         
-        return json.dumps(ast_tree, indent=2)
+        parts = []
+        _ast_json(ast_tree, '', parts)
+        return ''.join(parts)
         
     except Exception as e:
         return json.dumps({"type": "Error", "message": str(e), "children": []})
 
 
 if __name__ == "__main__":
-    import sys
-    
     # Check if we want AST output
     if len(sys.argv) > 1 and sys.argv[1] == '--ast':
         # Read from stdin
@@ -0,0 +1,62 @@
+import contextlib
+import io
+import unittest
+
+from java_parser import Lexer, interpret
+
+
+class LexerIdentifierTest(unittest.TestCase):
+    def assert_lex_error(self, code: str, message: str):
+        with self.assertRaises(SyntaxError) as raised:
+            Lexer(code).tokenize()
+        self.assertEqual(str(raised.exception), message)
+
+    def test_non_ascii_letters_in_name(self):
+        tokens = Lexer('int café = 3;').tokenize()
+        self.assertEqual(tokens[1].value, 'café')
+
+    def test_nbsp_inside_name(self):
+        self.assert_lex_error('int\xa0x = 5;', 'Line 1, Col 4: Unexpected character: \xa0')
+
+    def test_operator_sign_inside_name(self):
+        self.assert_lex_error('int a1 = 2; int b = a1×b;', 'Line 1, Col 23: Unexpected character: ×')
+
+
+
+def run_program(code: str) -> str:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        interpret(code)
+    return output.getvalue()
+
+
+class LoopConditionScopeTest(unittest.TestCase):
+    # The condition is tested after the body, but a local the body declares must not
+    # hide the field the condition reads
+    def test_while_condition_reads_field_shadowed_in_body(self):
+        output = run_program('''
+            public class Main {
+                int n = 3;
+                void count() {
+                    int i = 0;
+                    while (i < n) { int n = 10; System.out.println(i); i++; }
+                    System.out.println("done " + i);
+                }
+                public static void main(String[] args) { new Main().count(); }
+            }''')
+        self.assertEqual(output, '0\n1\n2\ndone 3\n')
+
+    def test_for_condition_reads_field_shadowed_in_body(self):
+        output = run_program('''
+            public class Main {
+                int n = 3;
+                void count() {
+                    for (int i = 0; i < n; i++) { int n = 10; System.out.println(i); }
+                }
+                public static void main(String[] args) { new Main().count(); }
+            }''')
+        self.assertEqual(output, '0\n1\n2\n')
+
+
+if __name__ == '__main__':
+    unittest.main()